@@ -1,13 +1,136 @@
 import sympy as sp
+from math import gcd, lcm
 '''' 
 First initialise key variables.  The variable initial is a dictionary that has all frontiers in a step, 
 with the associated probability. In this dictionary, zeroes denote infected sites, crosses healthy ones.
 The max number of iterations the program will run is stored in d. For the sympy algebra we define a 
-symbol lambda.
+symbol lambda, and the probabilities are exact rational functions of the variable λ.
 '''
-initial = { "xox" : 1}
+class RationalFunction:
+    '''
+    Exact rational function of λ, stored as numerator / (scale * (a_1 + b_1 λ)^m_1 * ... * (a_k + b_k λ)^m_k).
+    The numerator is a tuple of integer coefficients in order of increasing power, scale is a positive integer and
+    the linear factors are stored in factors as a dictionary from (a, b) to m, with a and b coprime. All probabilities
+    of the frontier expansion are of this form, since the total rates are linear in λ. Sums are taken over the least
+    common multiple of the denominators, preferably of many terms at once with RationalFunction.sum, so unlike sympy expressions they do not grow into trees, and the integer
+    content of the numerator is cancelled against scale.
+    '''
+    __slots__ = ('numerator', 'factors', 'scale')
+
+    def __init__(self, numerator, factors=None, scale=1):
+        content = gcd(scale, *numerator)
+        if content > 1:
+            numerator, scale = tuple(c // content for c in numerator), scale // content
+        self.numerator, self.factors, self.scale = tuple(numerator), factors or {}, scale
+
+    @staticmethod
+    def lift(other):
+        return other if isinstance(other, RationalFunction) else RationalFunction((other,))
+
+    def expand(self, factors, scale):
+        '''
+        factors, scale  :   A denominator that is a multiple of the denominator of self
+        Returns the numerator of self over that denominator.
+        '''
+        numerator = [c * (scale // self.scale) for c in self.numerator]
+        for (a, b), m in factors.items():
+            for _ in range(m - self.factors.get((a, b), 0)):
+                numerator = multiply(numerator, (a, b))
+        return numerator
+
+    @staticmethod
+    def sum(terms):
+        '''
+        terms   :   List of rational functions and integers
+        Returns the sum of terms, expanding every term once over the least common multiple of their denominators.
+        '''
+        terms = [RationalFunction.lift(term) for term in terms]
+        factors, scale = {}, 1
+        for term in terms:
+            for factor, m in term.factors.items():
+                factors[factor] = max(m, factors.get(factor, 0))
+            scale = lcm(scale, term.scale)
+        numerator = [0]
+        for term in terms:
+            expanded = term.expand(factors, scale)
+            numerator += [0] * (len(expanded) - len(numerator))
+            for i, c in enumerate(expanded):
+                numerator[i] += c
+        return RationalFunction(numerator, factors, scale)
+
+    def __add__(self, other):
+        return RationalFunction.sum([self, other])
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return RationalFunction([-c for c in self.numerator], self.factors, self.scale)
+
+    def __sub__(self, other):
+        return self + -RationalFunction.lift(other)
+
+    def __mul__(self, other):
+        other = RationalFunction.lift(other)
+        factors = dict(self.factors)
+        for factor, m in other.factors.items():
+            factors[factor] = factors.get(factor, 0) + m
+        numerator = [0] * (len(self.numerator) + len(other.numerator) - 1)
+        for i, c in enumerate(self.numerator):
+            for j, e in enumerate(other.numerator):
+                numerator[i + j] += c * e
+        return RationalFunction(numerator, factors, self.scale * other.scale)
+
+    __rmul__ = __mul__
+
+    def reciprocal(self):
+        '''
+        Returns 1 / self, for a self that is a polynomial of degree one with positive coefficients.
+        '''
+        if self.factors or len(self.numerator) != 2:
+            raise ValueError("only division by a linear polynomial is supported")
+        a, b = self.numerator
+        content = gcd(a, b)
+        return RationalFunction((self.scale,), {(a // content, b // content): 1}, content)
+
+    def __truediv__(self, other):
+        return self * RationalFunction.lift(other).reciprocal()
+
+    def __rtruediv__(self, other):
+        return RationalFunction.lift(other) * self.reciprocal()
+
+    def as_expr(self, symbol):
+        '''
+        Returns the sympy expression of self in symbol.
+        '''
+        denominator = self.scale * sp.Mul(*((a + b*symbol)**m for (a, b), m in self.factors.items()))
+        return sp.Poly(self.numerator[::-1], symbol).as_expr() / denominator
+
+    def smallest_positive_root(self, symbol, eps=1e-15):
+        '''
+        Isolates the positive real roots of the numerator with sympy, which are the positive roots of self since the
+        linear factors of the denominator are positive for positive λ.
+        Returns the smallest positive root, refined to width eps, or None if there is none.
+        '''
+        poly = sp.Poly(self.numerator[::-1], symbol)
+        intervals = [interval for interval, _ in poly.intervals(inf=0) if interval[1] > 0]
+        if not intervals:
+            return None
+        low, high = poly.refine_root(*min(intervals), eps=eps)
+        return (low + high) / 2
+
+'''
+numerator   :   List of integer coefficients of a polynomial in order of increasing power
+factor      :   Tuple (a, b) of the linear polynomial a + b λ
+Returns the coefficients of the product of both polynomials.
+'''
+def multiply(numerator, factor):
+    a, b = factor
+    return [a * c + b * e for c, e in zip(numerator + [0], [0] + numerator)]
+
+initial = { "xox" : RationalFunction((1,))}
 d = 12
-λ = sp.Symbol('λ')
+λ = RationalFunction((0, 1))
+λ_symbol = sp.Symbol('λ')
 '''
 state   :   String that represents a frontier state.
 Finds total rate of events that change the frontier.
@@ -31,7 +154,8 @@ i           :   The current index in state
 totalRate   :   The total rate of infection/healing in state
 state       :   A string that indicates currect state of the frontier
 probability :   The probability of reaching state
-next        :   The dictionary of possible states with probabilities after one more event
+next        :   The dictionary of possible states with the list of probabilities of the ways to reach them after one
+                more event, which are summed at once after all events
 Returns updated next with the events at i accounted for.
 '''
 def event(heal, i, totalRate, state, probability, next):
@@ -45,14 +169,14 @@ def event(heal, i, totalRate, state, probability, next):
     else:
         st = stringReplace(state, 'xo' if i == 0 else 'ox' if i == len(state) - 1 else 'o', i)
         prob = probability * 1/totalRate * λ
-    next[st] = next.get(st, 0) + prob
+    next.setdefault(st, []).append(prob)
     return next
 '''
 state_dict  :   Dictionary with frontier states and associated probabilities
 Returns the expected number of children with the frontier distribution state_dict.
 '''
 def expectation(state_dict):
-    return sum(prob * state.count('o') for state, prob in state_dict.items())
+    return RationalFunction.sum([prob * state.count('o') for state, prob in state_dict.items()])
 
 '''
 Using the event function, this snippet of code determine and prints the expect number
@@ -67,10 +191,7 @@ for index in range(d+1):
         probability = next_state[state]
         totalRate = getTotalRate(state)
         if(state == "xx" ):
-            if (state in next):
-                next[state] += probability
-            else:
-                next.update({ state :  probability} )  
+            next.setdefault(state, []).append(probability)
         elif(state != "xx" ):
             next = event(False, 0, totalRate, state, probability, next)
             next = event(False, len(state) - 1, totalRate, state, probability, next)
@@ -82,10 +203,10 @@ for index in range(d+1):
                         next = event(False, i, totalRate, state, probability, next)
                     if state[i + 1] == 'o':
                         next = event(False, i, totalRate, state, probability, next)
-    next_state = next
-    print(f"iteration {index}: λ = {sp.nsolve(expectation(next_state) - 1, λ, 1)}")
+    next_state = {state: RationalFunction.sum(probabilities) for state, probabilities in next.items()}
+    print(f"iteration {index}: λ = {float((expectation(next_state) - 1).smallest_positive_root(λ_symbol))}")
 '''
 We finally plot the solution to show how the expected value develops.
 '''
-p1 = sp.plot(expectation(next_state), xlim = (0, 3), ylim = (0,2), show=False)
+p1 = sp.plot(expectation(next_state).as_expr(λ_symbol), xlim = (0, 3), ylim = (0,2), show=False)
 p1.show()
\ No newline at end of file
@@ -0,0 +1,243 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import numpy as np
+'''
+Benchmark for the contact process simulators: the survival engines of Numerical_Estimation_Critical_Value.py,
+contact_process of Contact_Process_Realtime_2D.py and the grid engines of Contact_Process_Engine.py. Every workload runs in a fresh process, so that its peak resident
+memory is not polluted by earlier workloads, and with a fixed seed, so that all versions simulate the same runs.
+For every workload we report the number of events per second, the peak RSS, and the number of distinct sites stored
+per run, and all results are written to a JSON file. Only events that change the state count, so the failed infection
+attempts of the batch, jit and harris engines do not, and a site is stored once it is infected, or with the dict and
+packed engines once it is next to an infected site. Passing the results of an earlier version with --compare reports
+the workloads whose events per second dropped by more than the tolerance.
+
+Main variables:
+critical_values     :   Rough critical values of Z^d, used to place the rates of the workloads.
+rate_factors        :   The factors of the critical value at which we run sub-, near- and supercritical workloads.
+benchmark_seed      :   The root seed of all workloads.
+'''
+critical_values = {1: 1.6494, 2: 0.4119, 3: 0.2216, 4: 0.1507, 5: 0.1142, 20: 0.0262}
+rate_factors = {'sub': 0.8, 'near': 1.0, 'super': 1.25}
+benchmark_seed = 20250630
+
+def peak_rss():
+    '''
+    Returns the peak resident set size of the current process in bytes.
+    '''
+    try:
+        import resource
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def run_survival_workload(workload):
+    '''
+    workload    :   Dictionary with the engine, dimension, rate, thres, runs and max_steps of the workload
+    Runs the survival engine of the workload runs times, each from its own fixed seed.
+    Returns the measurements of the workload.
+    '''
+    import Numerical_Estimation_Critical_Value as cv
+    cv.thres = workload['thres']
+    cv.max_steps = workload['max_steps']
+    cv.root_seed = np.random.SeedSequence(benchmark_seed)
+    dimension, rate = workload['dimension'], workload['rate']
+    if workload['engine'] == 'jit':
+        cv.run_contact_process_jit(0.0, dimension)
+    baseline = peak_rss()
+    events = sites = survived = 0
+    start = time.perf_counter()
+    for index in range(workload['runs']):
+        stats = {}
+        seed = cv.task_seed(dimension, rate, 0, index)
+        if workload['engine'] == 'harris':
+            survived += int(cv.run_contact_process_harris([rate], dimension, seed=seed, stats=stats)[0])
+        else:
+            survived += int(cv.engines[workload['engine']](rate, dimension, seed=seed, stats=stats))
+        events += stats['events']
+        sites += stats['sites']
+    seconds = time.perf_counter() - start
+    return dict(workload, seconds=seconds, events=events, events_per_second=events / seconds,
+                sites_per_run=sites / workload['runs'], survived=survived,
+                baseline_rss=baseline, peak_rss=peak_rss())
+
+def run_batch_workload(workload):
+    '''
+    workload    :   Dictionary with the dimension, rate, thres, runs and max_steps of the workload
+    Runs all runs of the workload as the replicas of a single call to the batch engine.
+    Returns the measurements of the workload.
+    '''
+    import Numerical_Estimation_Critical_Value as cv
+    cv.thres = workload['thres']
+    cv.max_steps = workload['max_steps']
+    dimension, rate = workload['dimension'], workload['rate']
+    baseline = peak_rss()
+    stats = {}
+    start = time.perf_counter()
+    survived = cv.run_contact_process_batch(rate, dimension, workload['runs'], seed=benchmark_seed, stats=stats)
+    seconds = time.perf_counter() - start
+    return dict(workload, seconds=seconds, events=stats['events'], events_per_second=stats['events'] / seconds,
+                sites_per_run=stats['sites'] / workload['runs'], survived=int(np.sum(survived)),
+                baseline_rss=baseline, peak_rss=peak_rss())
+
+def run_realtime_workload(workload):
+    '''
+    workload    :   Dictionary with the grid size, rate, dt and steps of the workload
+    Runs contact_process of the realtime simulator, or for the engines 'grid', 'events', 'csr', 'csr-events' and
+    'active' contact_process_grid, EventGrid, contact_process_csr, EventGraph and ActiveGraph of
+    Contact_Process_Engine.py, for steps timesteps on a fully infected grid. Only the state of the selected engine is
+    built, so that the baseline RSS does not include the others. The events are the node updates: every timestep of
+    realtime, grid and csr updates every node, while EventGrid and EventGraph count their events and ActiveGraph its
+    active nodes, as returned by their advance.
+    Returns the measurements of the workload.
+    '''
+    import Contact_Process_Engine as cpe
+    np.random.seed(benchmark_seed)
+    size = workload['size']
+    grid = np.ones((size, size), dtype=bool)
+    inf_count = cpe.History(100)
+    if workload['engine'] == 'realtime':
+        import networkx as nx
+        import Contact_Process_Realtime_2D as rt
+        graph = nx.grid_2d_graph(size, size)
+        rt.inf = {node: 1 for node in graph}
+        rt.num_infected = graph.number_of_nodes()
+        rt.inf_count = inf_count
+    elif workload['engine'] == 'events':
+        event_grid = cpe.EventGrid(grid)
+    elif workload['engine'] in ('csr', 'csr-events', 'active'):
+        csr_graph = cpe.CSRGraph.grid(size, size)
+        state = grid.ravel().copy()
+        if workload['engine'] == 'csr-events':
+            graph_events = cpe.EventGraph(state, csr_graph)
+        elif workload['engine'] == 'active':
+            active_graph = cpe.ActiveGraph(state, csr_graph)
+    baseline = peak_rss()
+    events = 0
+    start = time.perf_counter()
+    for _ in range(workload['steps']):
+        if workload['engine'] == 'grid':
+            grid = cpe.contact_process_grid(grid, workload['dt'], workload['rate'])
+            inf_count.append(np.count_nonzero(grid))
+        elif workload['engine'] == 'events':
+            events += event_grid.advance(workload['dt'], workload['rate'])
+            inf_count.append(len(event_grid.infected))
+        elif workload['engine'] == 'csr':
+            state = cpe.contact_process_csr(state, csr_graph, workload['dt'], workload['rate'])
+            inf_count.append(np.count_nonzero(state))
+        elif workload['engine'] == 'csr-events':
+            events += graph_events.advance(workload['dt'], workload['rate'])
+            inf_count.append(len(graph_events.infected))
+        elif workload['engine'] == 'active':
+            events += active_graph.advance(workload['dt'], workload['rate'])
+            inf_count.append(active_graph.infected)
+        else:
+            rt.contact_process(graph, workload['dt'], workload['rate'])
+    seconds = time.perf_counter() - start
+    if workload['engine'] in ('realtime', 'grid', 'csr'):
+        events = workload['steps'] * size**2
+    return dict(workload, seconds=seconds, events=events, events_per_second=events / seconds,
+                sites_per_run=size**2, infected=int(inf_count.values()[-1]),
+                baseline_rss=baseline, peak_rss=peak_rss())
+
+def workload_key(workload):
+    '''
+    Returns a string that identifies a workload across versions.
+    '''
+    return "/".join(f"{name}={workload[name]}" for name in sorted(workload) if name in
+                    ('kind', 'engine', 'dimension', 'regime', 'thres', 'runs', 'size', 'steps', 'dt', 'rate'))
+
+def build_workloads(args):
+    '''
+    args    :   The parsed command line arguments
+    Returns the list of workloads, the cartesian product of engines, dimensions, regimes and thresholds, followed by
+    the realtime workloads.
+    '''
+    workloads = []
+    for engine in args.engines:
+        for dimension in args.dimensions:
+            for regime in args.regimes:
+                for thres in args.thresholds:
+                    workloads.append({'kind': 'survival', 'engine': engine, 'dimension': dimension, 'regime': regime,
+                                      'rate': critical_values[dimension] * rate_factors[regime], 'thres': thres,
+                                      'runs': args.runs, 'max_steps': args.max_steps})
+    for engine in args.realtime_engines:
+        for size in args.grid_sizes:
+            for rate in args.realtime_rates:
+                workloads.append({'kind': 'realtime', 'engine': engine, 'size': size, 'rate': rate, 'dt': 500,
+                                  'steps': args.realtime_steps})
+    return workloads
+
+def run_workload(workload):
+    '''
+    Dispatches a workload to the runner of its kind.
+    '''
+    if workload['kind'] == 'realtime':
+        return run_realtime_workload(workload)
+    if workload['engine'] == 'batch':
+        return run_batch_workload(workload)
+    return run_survival_workload(workload)
+
+def compare(results, baseline_path, tolerance):
+    '''
+    results         :   The results of this run
+    baseline_path   :   The JSON file with the results of an earlier version
+    tolerance       :   The relative drop in events per second that counts as a regression
+    Prints the speedup of every workload that occurs in both files, and marks the regressions.
+    Returns the number of regressions.
+    '''
+    with open(baseline_path) as baseline_file:
+        baseline = {workload_key(result): result for result in json.load(baseline_file)['results']}
+    regressions = 0
+    for result in results:
+        old = baseline.get(workload_key(result))
+        if old is None:
+            continue
+        speedup = result['events_per_second'] / old['events_per_second']
+        regression = speedup < 1 - tolerance
+        regressions += regression
+        print(f"{'REGRESSION ' if regression else ''}{workload_key(result)}: {speedup:.2f}x events/s, "
+              f"peak RSS {result['peak_rss'] / 2**20:.1f} MiB (was {old['peak_rss'] / 2**20:.1f} MiB)")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the contact process simulators.")
+    parser.add_argument('--engines', nargs='+', default=['dict', 'packed', 'batch', 'jit', 'harris'],
+                        help="survival engines, the batch engine runs all runs of a workload as its replicas")
+    parser.add_argument('--dimensions', nargs='+', type=int, default=[1, 2, 5, 20])
+    parser.add_argument('--regimes', nargs='+', default=list(rate_factors), choices=list(rate_factors))
+    parser.add_argument('--thresholds', nargs='+', type=int, default=[100, 500])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--max-steps', type=int, default=10**6, help="cap on the events of a single run")
+    parser.add_argument('--realtime-engines', nargs='+', default=['realtime', 'grid', 'events', 'csr', 'csr-events', 'active'],
+                        choices=['realtime', 'grid', 'events', 'csr', 'csr-events', 'active'],
+                        help="engines of the realtime simulator, contact_process, the vectorised contact_process_grid, "
+                        "the event driven EventGrid, or contact_process_csr, EventGraph and the active set ActiveGraph on the "
+                        "grid as a CSRGraph")
+    parser.add_argument('--grid-sizes', nargs='+', type=int, default=[20, 50])
+    parser.add_argument('--realtime-rates', nargs='+', type=float, default=[0.5, 2.0])
+    parser.add_argument('--realtime-steps', type=int, default=5)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="JSON results of an earlier version to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for workload in build_workloads(args):
+        with context.Pool(1) as pool:
+            result = pool.apply(run_workload, (workload,))
+        results.append(result)
+        print(f"{workload_key(result)}: {result['events_per_second']:.0f} events/s, "
+              f"{result['sites_per_run']:.0f} sites/run, peak RSS {result['peak_rss'] / 2**20:.1f} MiB")
+    with open(args.output, 'w') as output:
+        json.dump({'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+                   'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'seed': benchmark_seed, 'results': results},
+                  output, indent=2)
+    if args.compare:
+        sys.exit(1 if compare(results, args.compare, args.tolerance) else 0)
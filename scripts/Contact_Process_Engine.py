@@ -0,0 +1,430 @@
+import math
+import struct
+import zlib
+import numpy as np
+from scipy.sparse import csr_array
+'''
+Headless engines for the contact process on a grid or an arbitrary graph, used by the realtime simulator in Contact_Process_Realtime_2D.py
+and by the parameter sweeps of Sweep_Contact_Process_2D.py. Nothing here needs a display.
+
+The grid is a 2D boolean array of infected cells, where every cell recovers at rate 1/1000 and infects each of its
+four neighbours at rate rate/1000 per ms. With open boundaries the cells on the edge have fewer neighbours, with
+periodic boundaries the grid is a torus. Arbitrary graphs are converted once to a CSRGraph, on which the infection
+state is a 1D boolean array in the order of the nodes, and every infected node infects each of its neighbours at rate
+rate/1000 per ms. The random numbers are drawn from rng, which is the global numpy random
+state by default, or a numpy Generator for reproducible runs.
+'''
+
+def latest_event_times(rates, time_duration, rng=np.random):
+    '''
+    rates           :   Array with the rate of a Poisson process for every cell
+    time_duration   :   The time interval in which to generate events.
+    rng             :   The source of random numbers
+    Vectorised version of generate_poisson_events of Contact_Process_Realtime_2D.py for all cells at once. Looking back from the end of the interval,
+    the time to the last hit is exponential with the given rate, so the last hit is at time_duration minus an
+    exponential random variable. Returns these times, with -1 for the cells where this falls before the interval.
+    '''
+    with np.errstate(divide='ignore'):
+        times = time_duration - rng.standard_exponential(rates.shape) / rates
+    return np.where(times >= 0, times, -1)
+
+def infected_neighbours(grid, periodic=False):
+    '''
+    grid        :   2D boolean array of infected cells
+    periodic    :   Bool that determines whether the grid wraps around at its edges
+    Returns the number of infected neighbours of every cell, computed by shifting the grid in the four directions.
+    '''
+    if periodic:
+        return (np.roll(grid, 1, 0).astype(np.int8) + np.roll(grid, -1, 0) + np.roll(grid, 1, 1) + np.roll(grid, -1, 1))
+    counts = np.zeros(grid.shape, dtype=np.int8)
+    counts[1:, :] += grid[:-1, :]
+    counts[:-1, :] += grid[1:, :]
+    counts[:, 1:] += grid[:, :-1]
+    counts[:, :-1] += grid[:, 1:]
+    return counts
+
+def contact_process_grid(grid, dt, rate, periodic=False, rng=np.random):
+    '''
+    grid      :   2D boolean array of infected cells of the grid graph
+    dt        :   The simulation timestep
+    rate      :   The rate of the contact process
+    periodic  :   Bool that determines whether the grid wraps around at its edges
+    rng       :   The source of random numbers
+    Vectorised version of contact_process of Contact_Process_Realtime_2D.py on a grid. The last infection time of a cell is the maximum of the last hits
+    of one Poisson process per infected neighbour, which is the last hit of a single Poisson process with the summed
+    rate. As in contact_process a cell ends up infected if its last infection comes after its last recovery, and is
+    unchanged if neither happens. All cells are updated from the state at the start of the step, instead of from the
+    partially updated state of the in-place loop over the nodes.
+    Returns the new grid.
+    '''
+    return settle(grid, infected_neighbours(grid, periodic), dt, rate, rng)
+
+def settle(state, counts, dt, rate, rng=np.random):
+    '''
+    state   :   Boolean array of infected nodes
+    counts  :   Array with the number of infected neighbours of every node
+    dt      :   The simulation timestep
+    rate    :   The rate of the contact process
+    rng     :   The source of random numbers
+    Draws the last recovery and infection times of every node in the next dt ms.
+    Returns the new state.
+    '''
+    recov_time = latest_event_times(np.full(state.shape, 1/1000), dt, rng)
+    inf_time = latest_event_times(counts * (rate/1000), dt, rng)
+    return np.where((inf_time >= 0) | (recov_time >= 0), inf_time >= recov_time, state)
+
+def uniform_stream(rng=np.random, block_size=4096):
+    '''
+    rng         :   The source of random numbers
+    block_size  :   The number of uniforms drawn from numpy at once
+    Generator that yields uniform random numbers in [0, 1), drawn in blocks to avoid the overhead of numpy per number.
+    '''
+    while True:
+        yield from rng.random(block_size).tolist()
+
+class EventGrid:
+    '''
+    Exact continuous time contact process on a grid, simulated event by event. Every infected cell recovers at rate
+    1/1000 and infects each of its neighbours at rate rate/1000 per ms, as in contact_process_grid. The total rate of the
+    events is the number of infected cells times (1 + 4*rate)/1000, so we pick a uniform infected cell, which heals with
+    probability 1/(1 + 4*rate) and otherwise tries to infect a uniform one of its four neighbours. Attempts on neighbours
+    outside the grid or already infected do nothing. The infected cells are kept in a list with the position of every
+    cell in it, so that picking, adding and removing a cell takes constant time, and the cost of advancing the process
+    scales with the number of infected cells instead of the size of the grid.
+    Once all cells are healthy, time stays at the time of extinction.
+    '''
+    def __init__(self, grid, periodic=False, rng=np.random):
+        '''
+        grid        :   2D boolean array with the initially infected cells
+        periodic    :   Bool that determines whether the grid wraps around at its edges
+        rng         :   The source of random numbers
+        '''
+        self.grid = grid.copy()
+        self.cells = self.grid.ravel()
+        self.rows, self.cols = grid.shape
+        self.infected = np.flatnonzero(self.cells).tolist()
+        self.index = {cell: i for i, cell in enumerate(self.infected)}
+        self.time = 0
+        self.periodic = periodic
+        self.stream = uniform_stream(rng)
+
+    def add(self, cell):
+        self.cells[cell] = True
+        self.index[cell] = len(self.infected)
+        self.infected.append(cell)
+
+    def remove(self, cell):
+        self.cells[cell] = False
+        last = self.infected.pop()
+        i = self.index.pop(cell)
+        if last != cell:
+            self.infected[i] = last
+            self.index[last] = i
+
+    def advance(self, duration, rate):
+        '''
+        duration    :   The time in ms to advance the process
+        rate        :   The rate of the contact process
+        Runs all events in the next duration ms. Since the waiting times are exponential, the waiting time that runs
+        past the end can be cut off there without changing the law of the process.
+        Returns the number of events.
+        '''
+        end, events = self.time + duration, 0
+        heal = 1 / (1 + 4*rate)
+        stream, infected, cells, rows, cols, periodic = (self.stream, self.infected, self.cells, self.rows, self.cols,
+                                                         self.periodic)
+        while infected:
+            self.time -= math.log(1 - next(stream)) * 1000 / (len(infected) * (1 + 4*rate))
+            if self.time > end:
+                break
+            events += 1
+            cell = infected[int(next(stream) * len(infected))]
+            if next(stream) < heal:
+                self.remove(cell)
+                continue
+            row, col = divmod(cell, cols)
+            direction = int(next(stream) * 4)
+            if direction == 0 and row > 0:
+                target = cell - cols
+            elif direction == 1 and row < rows - 1:
+                target = cell + cols
+            elif direction == 2 and col > 0:
+                target = cell - 1
+            elif direction == 3 and col < cols - 1:
+                target = cell + 1
+            elif not periodic:
+                continue
+            elif direction == 0:
+                target = cell + (rows - 1)*cols
+            elif direction == 1:
+                target = col
+            elif direction == 2:
+                target = cell + cols - 1
+            else:
+                target = cell - col
+            if not cells[target]:
+                self.add(target)
+        if infected:
+            self.time = end
+        return events
+
+class CSRGraph:
+    '''
+    Graph in compressed sparse row form, in which the neighbours of node i are indices[indptr[i]:indptr[i + 1]].
+    Every edge is stored in both directions, as nx.all_neighbors reports it in contact_process, so parallel edges count
+    multiple times. Self-loops are dropped, since a node cannot infect itself.
+    '''
+    def __init__(self, size, edges, nodes=None):
+        '''
+        size    :   The number of nodes
+        edges   :   Array of shape (m, 2) with the node numbers of the endpoints of every edge
+        nodes   :   The original nodes in the order of their numbers, if any
+        '''
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        sources = np.concatenate([edges[:, 0], edges[:, 1]])
+        targets = np.concatenate([edges[:, 1], edges[:, 0]])
+        self.size, self.nodes = size, nodes
+        self.indices = targets[np.argsort(sources, kind='stable')]
+        self.degree = np.bincount(sources, minlength=size)
+        self.indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(self.degree, out=self.indptr[1:])
+        self.adjacency = csr_array((np.ones(len(self.indices), dtype=np.int32), self.indices, self.indptr),
+                                   shape=(size, size))
+
+    @classmethod
+    def from_networkx(cls, graph):
+        '''
+        graph   :   A networkx graph
+        Returns the CSRGraph of the graph, with the nodes numbered in the order of iteration over the graph.
+        '''
+        nodes = list(graph)
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = np.fromiter((index[node] for edge in graph.edges() for node in edge[:2]), dtype=np.int64,
+                            count=2*graph.number_of_edges())
+        return cls(len(nodes), edges, nodes)
+
+    @classmethod
+    def grid(cls, rows, cols, periodic=False):
+        '''
+        rows, cols  :   The shape of the grid
+        periodic    :   Bool that determines whether the grid wraps around at its edges
+        Returns the CSRGraph of the grid, with the cells numbered in row major order, without going through networkx.
+        '''
+        cells = np.arange(rows*cols).reshape(rows, cols)
+        edges = [np.stack([cells[:, :-1].ravel(), cells[:, 1:].ravel()], axis=1),
+                 np.stack([cells[:-1, :].ravel(), cells[1:, :].ravel()], axis=1)]
+        if periodic:
+            edges += [np.stack([cells[:, -1], cells[:, 0]], axis=1), np.stack([cells[-1, :], cells[0, :]], axis=1)]
+        return cls(rows*cols, np.concatenate(edges))
+
+def infected_neighbours_csr(state, graph):
+    '''
+    state   :   1D boolean array of infected nodes
+    graph   :   The CSRGraph
+    Returns the number of infected neighbours of every node, as the sparse product of the adjacency matrix and state.
+    '''
+    return graph.adjacency @ state.astype(np.int32)
+
+def contact_process_csr(state, graph, dt, rate, rng=np.random):
+    '''
+    state   :   1D boolean array of infected nodes
+    graph   :   The CSRGraph on which we do the contact process
+    dt      :   The simulation timestep
+    rate    :   The rate of the contact process
+    rng     :   The source of random numbers
+    Version of contact_process_grid for an arbitrary graph. All nodes are updated from the state at the start of the
+    step.
+    Returns the new state.
+    '''
+    return settle(state, infected_neighbours_csr(state, graph), dt, rate, rng)
+
+class EventGraph(EventGrid):
+    '''
+    Version of EventGrid for an arbitrary CSRGraph. With the maximum degree D of the graph, the total rate of the events
+    is the number of infected nodes times (1 + D*rate)/1000, so we pick a uniform infected node, which heals with
+    probability 1/(1 + D*rate) and otherwise picks a uniform one of D slots. Slots beyond the degree of the node do
+    nothing, the others try to infect the corresponding neighbour. This keeps every event constant time on graphs
+    with different degrees, at the cost of wasted events on graphs with a few nodes of much higher degree.
+    '''
+    def __init__(self, state, graph, rng=np.random):
+        '''
+        state   :   1D boolean array with the initially infected nodes
+        graph   :   The CSRGraph on which we do the contact process
+        rng     :   The source of random numbers
+        '''
+        self.grid = self.cells = state.copy()
+        self.indptr, self.indices = graph.indptr.tolist(), graph.indices.tolist()
+        self.max_degree = int(graph.degree.max(initial=0))
+        self.infected = np.flatnonzero(self.cells).tolist()
+        self.index = {cell: i for i, cell in enumerate(self.infected)}
+        self.time = 0
+        self.stream = uniform_stream(rng)
+
+    def advance(self, duration, rate):
+        '''
+        duration    :   The time in ms to advance the process
+        rate        :   The rate of the contact process
+        Runs all events in the next duration ms.
+        Returns the number of events.
+        '''
+        end, events = self.time + duration, 0
+        heal = 1 / (1 + self.max_degree*rate)
+        stream, infected, cells, indptr, indices = self.stream, self.infected, self.cells, self.indptr, self.indices
+        while infected:
+            self.time -= math.log(1 - next(stream)) * 1000 / (len(infected) * (1 + self.max_degree*rate))
+            if self.time > end:
+                break
+            events += 1
+            cell = infected[int(next(stream) * len(infected))]
+            if next(stream) < heal:
+                self.remove(cell)
+                continue
+            slot = indptr[cell] + int(next(stream) * self.max_degree)
+            if slot < indptr[cell + 1] and not cells[indices[slot]]:
+                self.add(indices[slot])
+        if infected:
+            self.time = end
+        return events
+
+class ActiveGraph:
+    '''
+    Version of contact_process_csr that only updates the active nodes, the infected nodes and their healthy neighbours.
+    A healthy node without infected neighbours stays healthy during a step, so skipping it does not change the process.
+    The number of infected neighbours of every node and the sorted array of active nodes are updated with the nodes
+    that flip in a step, so the cost of a step scales with the number of active nodes instead of the size of the graph.
+    '''
+    def __init__(self, state, graph, rng=np.random):
+        '''
+        state   :   1D boolean array with the initially infected nodes
+        graph   :   The CSRGraph on which we do the contact process
+        rng     :   The source of random numbers
+        '''
+        self.graph, self.rng = graph, rng
+        self.state = state.copy()
+        self.counts = infected_neighbours_csr(self.state, graph)
+        self.active = np.flatnonzero(self.state | (self.counts > 0))
+        self.infected = int(np.count_nonzero(self.state))
+
+    def neighbours(self, nodes):
+        '''
+        nodes   :   Array of nodes
+        Returns the concatenated neighbours of the nodes, and the number of neighbours of every node.
+        '''
+        starts, lengths = self.graph.indptr[nodes], self.graph.degree[nodes]
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return self.graph.indices[offsets], lengths
+
+    def advance(self, dt, rate):
+        '''
+        dt      :   The simulation timestep
+        rate    :   The rate of the contact process
+        Updates all active nodes from the state at the start of the step.
+        Returns the number of active nodes that were updated.
+        '''
+        active = self.active
+        old = self.state[active]
+        new = settle(old, self.counts[active], dt, rate, self.rng)
+        flipped = active[new != old]
+        if len(flipped) == 0:
+            return len(active)
+        infected = new[new != old]
+        self.state[flipped] = infected
+        self.infected += 2*int(np.count_nonzero(infected)) - len(flipped)
+        neighbours, lengths = self.neighbours(flipped)
+        np.add.at(self.counts, neighbours, np.repeat(np.where(infected, 1, -1), lengths).astype(self.counts.dtype))
+        candidates = np.union1d(flipped, neighbours)
+        stays = self.state[candidates] | (self.counts[candidates] > 0)
+        self.active = np.union1d(np.setdiff1d(active, candidates[~stays], assume_unique=True), candidates[stays])
+        return len(active)
+
+class History:
+    '''
+    Ring buffer that keeps the last size infection counts in a fixed array, so that long runs use constant memory.
+    '''
+    def __init__(self, size):
+        self.counts = np.zeros(size, dtype=np.int64)
+        self.length = 0
+
+    def append(self, count):
+        self.counts[self.length % len(self.counts)] = count
+        self.length += 1
+
+    def values(self):
+        '''
+        Returns the stored counts from oldest to newest.
+        '''
+        length, size = self.length, len(self.counts)
+        if length <= size:
+            return self.counts[:length].copy()
+        return np.roll(self.counts, -(length % size))
+
+'''
+Recordings store the full infection state of the grid at every step. A recording starts with a header of the magic
+bytes, the format version and the shape of the grid, followed by chunks. Every chunk has a header with the number of
+frames, whether it is compressed with zlib and the length of its payload. The payload holds the times of its frames as
+float64, followed by the frames with one bit per cell.
+'''
+recording_magic = b'CPRC'
+recording_header = struct.Struct('<4sHII')
+chunk_header = struct.Struct('<I?Q')
+
+class Recorder:
+    '''
+    Streams the infection states of a grid to a recording, buffering chunk_frames frames before writing a chunk.
+    '''
+    def __init__(self, path, rows, cols, chunk_frames=256, compress=True):
+        '''
+        path            :   The file to write the recording to
+        rows, cols      :   The shape of the grid
+        chunk_frames    :   The number of frames in a chunk
+        compress        :   Bool that determines whether the chunks are compressed
+        '''
+        self.file = open(path, 'wb')
+        self.file.write(recording_header.pack(recording_magic, 1, rows, cols))
+        self.cells, self.chunk_frames, self.compress = rows*cols, chunk_frames, compress
+        self.times, self.frames = [], []
+
+    def record(self, current_time, state):
+        '''
+        current_time    :   The time of the frame
+        state           :   The infection state of every cell, in the row major order of the grid
+        '''
+        self.times.append(current_time)
+        self.frames.append(np.packbits(state.astype(bool, copy=False)))
+        if len(self.frames) == self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        if not self.frames:
+            return
+        payload = np.array(self.times, dtype='<f8').tobytes() + np.concatenate(self.frames).tobytes()
+        if self.compress:
+            payload = zlib.compress(payload)
+        self.file.write(chunk_header.pack(len(self.frames), self.compress, len(payload)))
+        self.file.write(payload)
+        self.times, self.frames = [], []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def read_recording(path):
+    '''
+    path    :   The file with the recording
+    Generator that yields the (time, grid) pairs of a recording, reading one chunk at a time.
+    '''
+    with open(path, 'rb') as file:
+        magic, version, rows, cols = recording_header.unpack(file.read(recording_header.size))
+        if magic != recording_magic or version != 1:
+            raise ValueError(f"{path} is not a recording")
+        frame_bytes = (rows*cols + 7) // 8
+        while header := file.read(chunk_header.size):
+            frames, compressed, length = chunk_header.unpack(header)
+            payload = file.read(length)
+            if compressed:
+                payload = zlib.decompress(payload)
+            times = np.frombuffer(payload, dtype='<f8', count=frames)
+            packed = np.frombuffer(payload, dtype=np.uint8, offset=8*frames).reshape(frames, frame_bytes)
+            for current_time, frame in zip(times, packed):
+                yield current_time, np.unpackbits(frame, count=rows*cols).astype(bool).reshape(rows, cols)
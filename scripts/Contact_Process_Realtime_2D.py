@@ -1,50 +1,16 @@
 import matplotlib.pyplot as plt
+from matplotlib.colors import ListedColormap
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
 from tkinter import *
 import psutil
 import numpy as np
 import networkx as nx
-
-'''
-We configure a Tkinter window, and the associated objects required to draw the network and graph.
-'''
-root = Tk()
-defaultFont = tk.font.nametofont('TkDefaultFont')
-frame= Frame(root).pack(fill= BOTH, padx= 0, pady=0)
-root.title("Contact process")
-screen_width = root.winfo_screenwidth()
-screen_height = root.winfo_screenheight()
-fig = plt.figure(frameon=True, figsize=(screen_width/100,screen_height/100), dpi=102)
-canvas = FigureCanvasTkAgg(fig, root)
-
-'''
-Keybinds:
-button_0    :   Display a graph that shows the number of infection over time.
-scroll      :   Increase/decrease the rate of infection.
-F11         :   Toggle fullscreen.
-'''
-root.bind("<F11>", lambda e: root.attributes("-fullscreen", not root.attributes("-fullscreen")))
-root.bind("<Button-1>", lambda event: globals().__setitem__('display_infections', not display_infections))
-root.bind("<MouseWheel>", lambda event: globals().__setitem__('r', max(0, r + 0.1 if event.delta > 0 else r - 0.1)))
-
-'''
-Main variables:
-G                   :   The graph on which we run the contact process.
-dt                  :   The timestep in ms at which we update the graph.
-T                   :   The final time in ms the simulation
-r                   :   The initial infection rate per second
-display_infection   :   Bool that determines whether or not a graph is displayed that shows recent infections.
-inf                 :   A list of infected nodes
-inf_count           :   Stores the number of infected nodes at each timestep
-'''
-scale = 35
-G = nx.grid_2d_graph((int)(screen_height/scale), (int)(screen_width/scale)) 
-dt, T, r = 500, 1000000, 0.5
-global display_infections; display_infections = False
-inf = {list(G)[i] : 1 for i in range(len(list(G)))}
-pos = {(x,y):(y,-x) for x,y in G.nodes()}
-inf_count = []
+from Contact_Process_Engine import (contact_process_grid, EventGrid, CSRGraph, contact_process_csr, EventGraph,
+                                   ActiveGraph, History, Recorder)
+import queue
+import threading
+import time
 
 def generate_poisson_events(rate, time_duration):
     '''
@@ -63,8 +29,10 @@ def contact_process(graph, dt, rate):
     graph     :   The graph on which we do the contact process
     dt        :   The simulation timestep
     rate      :   The rate of the contact process
-    Updates the inf array to represent the contact process and append the number of infection at this time to inf_count
+    Updates the inf array to represent the contact process and append the number of infection at this time to inf_count.
+    The number of infections num_infected is updated with every change of inf, instead of counted over all nodes.
     '''
+    global num_infected
     for i in graph.nodes():
         recov_time = generate_poisson_events(1/1000, dt)
         inf_time = -1
@@ -72,38 +40,133 @@ def contact_process(graph, dt, rate):
             if inf[j] == 1:
                 inf_time = max(inf_time, generate_poisson_events(rate/1000, dt))
         if inf_time >= 0 or recov_time >= 0:
-            inf[i] = 0 if recov_time > inf_time else 1
-    inf_count.append(sum(1 for value in inf.values() if value == 1))
+            value = 0 if recov_time > inf_time else 1
+            num_infected += value - inf[i]
+            inf[i] = value
+    inf_count.append(num_infected)
+
+'''Generates colours for networkx to draw infected nodes red, and healthy ones blue, from the infection state of every node'''
+def generate_colour_map(values):
+    return ['#BF211E' if value == 1 else '#1f77b4' for value in values]
+
+
+def step():
+    '''
+    Advances the contact process by dt with the selected engine, and appends the number of infections to inf_count.
+    Returns the infection state of every node, as a copy that later steps do not change.
+    '''
+    global grid, state
+    if engine == 'nodes':
+        contact_process(G, dt, r)
+        return np.fromiter(inf.values(), dtype=bool, count=len(inf))
+    if engine == 'csr':
+        state = contact_process_csr(state, csr_graph, dt, r)
+        inf_count.append(np.count_nonzero(state))
+        return state.copy()
+    if engine == 'csr-events':
+        graph_events.advance(dt, r)
+        inf_count.append(len(graph_events.infected))
+        return graph_events.cells.copy()
+    if engine == 'active':
+        active_graph.advance(dt, r)
+        inf_count.append(active_graph.infected)
+        return active_graph.state.copy()
+    if engine == 'grid':
+        grid = contact_process_grid(grid, dt, r)
+        inf_count.append(np.count_nonzero(grid))
+    else:
+        events.advance(dt, r)
+        grid = events.grid
+        inf_count.append(len(events.infected))
+    return grid.ravel().copy()
 
-'''Generates colours for networkx to draw infected nodes red, and healthy ones blue'''
-def generate_colour_map(inf):
-    return ['#BF211E' if value == 1 else '#1f77b4' for value in inf.values()]
+def publish(frames, snapshot):
+    '''
+    frames      :   Bounded queue of snapshots waiting to be drawn
+    snapshot    :   The snapshot to add
+    Adds the snapshot to the queue, dropping the oldest snapshot when the queue is full, so that the simulation never
+    waits for the renderer.
+    '''
+    while True:
+        try:
+            frames.put_nowait(snapshot)
+            return
+        except queue.Full:
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                pass
 
+def latest_snapshot(frames):
+    '''
+    frames  :   Bounded queue of snapshots waiting to be drawn
+    Empties the queue, dropping all stale snapshots.
+    Returns the newest snapshot, or None if the queue is empty.
+    '''
+    snapshot = None
+    while True:
+        try:
+            snapshot = frames.get_nowait()
+        except queue.Empty:
+            return snapshot
 
-def timeStep(current_time):
+def simulate(frames, stop):
+    '''
+    frames  :   Bounded queue to which the snapshots are published
+    stop    :   Event that is set when the window is closed
+    Runs the contact process until time T, extinction or stop in a background thread, publishing a snapshot of
+    (time, infection state) after every step. If speed is set, sleeps to simulate at most speed ms per ms of wall time.
+    '''
+    start = time.perf_counter()
+    for i in range((int)(T/dt)):
+        if stop.is_set():
+            return
+        state = step()
+        if recorder is not None:
+            recorder.record((i + 1)*dt, state)
+        publish(frames, ((i + 1)*dt, state))
+        if not state.any():
+            return
+        if speed:
+            time.sleep(max(0, (i + 1)*dt/speed/1000 - (time.perf_counter() - start)))
+
+def render(frames, worker):
+    '''
+    frames  :   Bounded queue of snapshots published by the simulation
+    worker  :   The thread running the simulation
+    Draws the newest snapshot, if any, and schedules itself again after frame_interval ms while the simulation runs
+    or snapshots are left.
+    '''
+    snapshot = latest_snapshot(frames)
+    if snapshot is not None:
+        r_label.config(text=f"Rate (λ): {r:.2f}")
+        if raster:
+            view.draw(*snapshot)
+        else:
+            timeStep(*snapshot)
+    if worker.is_alive() or not frames.empty():
+        root.after(frame_interval, render, frames, worker)
+
+def timeStep(current_time, state):
     '''
     current_time    :   The time at which we want to display the contact process
-    This function clears the previous figure does the following three things
-    1.  Draw a label that show the current rate
-    2.  Draw G
-    3.  If display_infections is true, draw a graph that shows the number of infections
+    state           :   The infection state of every node at that time
+    This function clears the previous figure does the following two things
+    1.  Draw G
+    2.  If display_infections is true, draw a graph that shows the number of infections
     '''
     plt.clf()
-    r_label = Label(root, text=f"Rate (λ): {r:.2f}", font=("Open Sans", 36), fg="black", bg="white", bd=5, relief="solid")
-    r_label.place(relx=0.5, rely=0.03, anchor="n")
-    r_label.config(text=f"Rate (λ): {r:.2f}")
-    
-    col = generate_colour_map(inf)
+    col = generate_colour_map(state)
     ax = plt.gca() 
-    ax.set_xlim([min(x for x, y in pos.values()) + 1, max(x for x, y in pos.values()) - 1])
-    ax.set_ylim([min(y for x, y in pos.values()) + 1, max(y for x, y in pos.values()) - 1])
+    ax.set_xlim(xlim)
+    ax.set_ylim(ylim)
     ax.set_axis_off() 
     nx.draw(G, pos, ax=ax, node_size=screen_width/(0.1*scale), node_color=col, with_labels=False, edgecolors='black', linewidths=1.5, node_shape='s')
     plt.subplots_adjust(left=0, right=1, top=1, bottom=0) 
 
     if(display_infections):
         plt.subplot(1, 2, 1, facecolor=(1, 1, 1, 0.8))
-        plt.plot(inf_count[max(0, len(inf_count) - 100): len(inf_count) - 1],linewidth=5)
+        plt.plot(inf_count.values(),linewidth=5)
         plt.ylim(0, len(G.nodes()))
         plt.xlabel("time (ms)", labelpad=-35, loc='center', fontsize=18), plt.ylabel("infections", labelpad=-35, loc='center', fontsize=18)
         plt.title("Infected sites over time", pad=-20, loc='center', y=0.95, fontsize=36)
@@ -115,15 +178,161 @@ def timeStep(current_time):
     canvas.draw()
     canvas.get_tk_widget().pack(side=TOP, fill=BOTH, expand=True)
 
-'''
-Main loop:
-Runs the contact and visualises the contact process until time T.
-'''
-for i in range((int)(T/dt)):
-    if not (1 in inf.values()):
-        break
-    root.update_idletasks()
-    root.update()
-    contact_process(G, dt, r)
-    root.after(0, timeStep(i*dt))
-root.mainloop()
\ No newline at end of file
+class RasterView:
+    '''
+    Draws the grid as a single image with one pixel per node, and the infections over time as a single line, both
+    created once and updated in place. Everything else is drawn once into a background that is restored every frame,
+    after which only the image and the graph of infections are drawn and blitted, so a frame costs the same for any
+    number of nodes. The graph is drawn as a whole, with its panel, spines and labels, since the image covers the
+    entire figure and would hide anything of the graph in the background.
+    '''
+    def __init__(self, fig, canvas, rows, cols, history=100):
+        '''
+        fig         :   The figure to draw in
+        canvas      :   The canvas of the figure
+        rows, cols  :   The shape of the grid
+        history     :   The length of the x-axis of the graph of infections
+        '''
+        self.fig, self.canvas, self.rows, self.cols = fig, canvas, rows, cols
+        fig.clf()
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_axis_off()
+        self.image = ax.imshow(np.ones((rows, cols)), cmap=ListedColormap(['#1f77b4', '#BF211E']), vmin=0, vmax=1,
+                               interpolation='nearest', aspect='auto', animated=True)
+        self.inset = fig.add_subplot(1, 2, 1, facecolor=(1, 1, 1, 0.8))
+        self.inset.set_animated(True)
+        self.line, = self.inset.plot([], [], linewidth=5, color='black')
+        self.inset.set_xlim(0, history)
+        self.inset.set_ylim(0, rows*cols)
+        self.inset.set_xlabel("time (ms)", labelpad=-35, loc='center', fontsize=18)
+        self.inset.set_ylabel("infections", labelpad=-35, loc='center', fontsize=18)
+        self.inset.set_title("Infected sites over time", pad=-20, loc='center', y=0.95, fontsize=36)
+        self.inset.tick_params(labelsize=0)
+        for spine in self.inset.spines.values():
+            spine.set_edgecolor('black')
+            spine.set_linewidth(5)
+        self.inset.set_visible(False)
+        self.background = None
+        canvas.mpl_connect('draw_event', self.capture)
+        canvas.get_tk_widget().pack(side=TOP, fill=BOTH, expand=True)
+
+    def capture(self, event):
+        '''
+        Stores the background after every full redraw of the figure, for example after a resize, and draws the
+        animated artists on top of it.
+        '''
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        self.image.axes.draw_artist(self.image)
+        if self.inset.get_visible():
+            self.fig.draw_artist(self.inset)
+
+    def draw(self, current_time, state):
+        '''
+        current_time    :   The time at which we want to display the contact process
+        state           :   The infection state of every node at that time, in the row major order of the grid
+        Updates the image and, if display_infections is true, the graph of infections, and blits them onto the
+        background. Showing or hiding the graph of infections needs one full redraw.
+        '''
+        self.image.set_data(state.reshape(self.rows, self.cols))
+        counts = inf_count.values()
+        self.line.set_data(np.arange(len(counts)), counts)
+        if self.background is None or self.inset.get_visible() != display_infections:
+            self.inset.set_visible(display_infections)
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.fig.bbox)
+
+if __name__ == '__main__':
+    '''
+    We configure a Tkinter window, and the associated objects required to draw the network and graph.
+    '''
+    root = Tk()
+    defaultFont = tk.font.nametofont('TkDefaultFont')
+    frame= Frame(root).pack(fill= BOTH, padx= 0, pady=0)
+    root.title("Contact process")
+    screen_width = root.winfo_screenwidth()
+    screen_height = root.winfo_screenheight()
+    fig = plt.figure(frameon=True, figsize=(screen_width/100,screen_height/100), dpi=102)
+    canvas = FigureCanvasTkAgg(fig, root)
+    r_label = Label(root, font=("Open Sans", 36), fg="black", bg="white", bd=5, relief="solid")
+    r_label.place(relx=0.5, rely=0.03, anchor="n")
+
+    '''
+    Keybinds:
+    button_0    :   Display a graph that shows the number of infection over time.
+    scroll      :   Increase/decrease the rate of infection.
+    F11         :   Toggle fullscreen.
+    '''
+    root.bind("<F11>", lambda e: root.attributes("-fullscreen", not root.attributes("-fullscreen")))
+    root.bind("<Button-1>", lambda event: globals().__setitem__('display_infections', not display_infections))
+    root.bind("<MouseWheel>", lambda event: globals().__setitem__('r', max(0, r + 0.1 if event.delta > 0 else r - 0.1)))
+
+    '''
+    Main variables:
+    G                   :   The graph on which we run the contact process.
+    dt                  :   The timestep in ms at which we update the graph.
+    T                   :   The final time in ms the simulation
+    r                   :   The initial infection rate per second
+    display_infection   :   Bool that determines whether or not a graph is displayed that shows recent infections.
+    engine              :   The simulator, 'nodes' for contact_process, 'grid' for contact_process_grid and 'events' for EventGrid.
+                            'csr' for contact_process_csr, 'csr-events' for EventGraph and 'active' for ActiveGraph run on csr_graph,
+                            and work for any G.
+    inf                 :   A list of infected nodes, used by the 'nodes' engine
+    grid                :   The infected nodes as a 2D boolean array, used by the 'grid' and 'events' engines
+    csr_graph           :   G converted to a CSRGraph, used by the 'csr' and 'csr-events' engines
+    state               :   The infected nodes as a 1D boolean array in the order of G, used by the 'csr' engine
+    num_infected        :   The number of infected nodes, kept up to date by contact_process
+    inf_count           :   Stores the number of infected nodes of the last 100 timesteps
+    speed               :   The number of simulated ms per ms of wall time, 1 runs in real time. None simulates as fast as
+                            possible, which can finish the whole run within seconds, after which the rate can not be changed.
+    frame_interval      :   The time in ms between two frames of the renderer.
+    frame_buffer        :   The number of snapshots the simulation can publish ahead of the renderer before the oldest are dropped.
+    raster              :   Bool that determines whether the grid is drawn by a RasterView instead of nx.draw of every node.
+    record_path         :   The file to which every step is recorded, read back with read_recording, or None to not record.
+    '''
+    scale = 35
+    rows, cols = (int)(screen_height/scale), (int)(screen_width/scale)
+    G = nx.grid_2d_graph(rows, cols) 
+    dt, T, r = 500, 1000000, 0.5
+    global display_infections; display_infections = False
+    engine = 'events'
+    inf = {list(G)[i] : 1 for i in range(len(list(G)))}
+    grid = np.ones((rows, cols), dtype=bool)
+    pos = {(x,y):(y,-x) for x,y in G.nodes()}
+    xlim, ylim = [1, cols - 2], [-(rows - 2), -1]
+    events = EventGrid(grid)
+    csr_graph = CSRGraph.from_networkx(G)
+    state = np.ones(len(G), dtype=bool)
+    graph_events = EventGraph(state, csr_graph)
+    active_graph = ActiveGraph(state, csr_graph)
+    num_infected = len(inf)
+    inf_count = History(100)
+    speed = 1.0
+    frame_interval = 30
+    frame_buffer = 2
+    raster = True
+    view = RasterView(fig, canvas, rows, cols) if raster else None
+    record_path = None
+    recorder = Recorder(record_path, rows, cols) if record_path else None
+
+    '''
+    Main loop:
+    The contact process runs in a background thread that publishes snapshots into a bounded queue, while the Tkinter
+    loop draws the newest snapshot at its own frame rate and drops the stale ones, so the simulation is not held up
+    by slow redraws.
+    '''
+    frames = queue.Queue(maxsize=frame_buffer)
+    stop = threading.Event()
+    worker = threading.Thread(target=simulate, args=(frames, stop), daemon=True)
+    worker.start()
+    root.after(0, render, frames, worker)
+    root.mainloop()
+    stop.set()
+    worker.join()
+    if recorder is not None:
+        recorder.close()
@@ -1,49 +1,67 @@
 import sympy as sp
+import math
+import multiprocessing
+import numpy as np
+from scipy.sparse import csr_array, identity
+from scipy.sparse.linalg import bicgstab
 '''' 
 First initialise key variables.  The variable initial is a dictionary that has all frontiers in a step, 
-with the associated probability. In this dictionary, zeroes denote infected sites, crosses healthy ones.
+with the associated probability. In this dictionary, set bits denote infected sites, as explained below.
 The max number of iterations the program will run is stored in d. For the sympy algebra we define a 
 symbol lambda.
 '''
-initial = { "xox" : 1}
+initial = { 1 : 1}
 d = 50
 λ = 1.05
 '''
-state   :   String that represents a frontier state.
-Finds total rate of events that change the frontier.
+The frontier states are stored as bitmasks. Bit i is set if site i of the frontier, without the healthy sites at both
+ends, is infected, so "xox" is 1, "xooxox" is 0b1011 and "xx" is 0. Since the sites at the ends of a frontier are
+infected, its length is the bit length of its mask. The dynamics are symmetric under reversal of the frontier, and the
+number of infected sites does not change under reversal, so every state is stored as the smaller of its mask and the
+mask of its reversal.
 '''
-def getTotalRate(state):
-    rate = 2*λ
-    for i in range(1, len(state) - 1):
-        rate += 1 if state[i] == 'o' else λ * (int(state[i - 1] == 'o') + int(state[i + 1] == 'o'))
-    return rate
 '''
-string      :   String to change
-insert      :   The value to insert into string
-position    :   Position at which we will insert string
-Returns string with insert inserted at position.
+state   :   Bitmask of a frontier state.
+Returns the canonical form of state, the smaller of state and its reversal.
+'''
+def canonical(state):
+    return min(state, int(bin(state)[:1:-1], 2)) if state else 0
+'''
+state_dict  :   Dictionary with frontier states and associated probabilities
+Returns state_dict with the probabilities of mirror images merged into their canonical form.
 '''
-def stringReplace(string, insert, position):
-    return string[:position] + insert + string[position + 1:] 
+def merge_mirrors(state_dict):
+    merged = {}
+    for state, prob in state_dict.items():
+        st = canonical(state)
+        merged[st] = merged.get(st, 0) + prob
+    return merged
+'''
+state   :   Bitmask of a frontier state.
+Finds total rate of events that change the frontier. Every infected site heals at rate 1, and every pair of
+neighbouring sites of which one is infected gives rate λ, which are the set bits of state ^ (state >> 1) below the
+top bit, plus the two healthy sites at both ends.
+'''
+def getTotalRate(state):
+    return 2*λ + state.bit_count() + λ * ((state ^ (state >> 1)) & ((1 << (state.bit_length() - 1)) - 1)).bit_count()
 '''
 heal        :   A bool that indicates whether or not the event is a recovery
-i           :   The current index in state
+i           :   The site of state at which the event happens, -1 and the length of state for the healthy sites at the ends
 totalRate   :   The total rate of infection/healing in state
-state       :   A string that indicates currect state of the frontier
+state       :   The bitmask of the currect state of the frontier
 probability :   The probability of reaching state
 next        :   The dictionary of possible states with probabilities after one more event
-Returns updated next with the events at i accounted for.
+Returns updated next with the events at i accounted for. After a recovery the healthy sites at the start of the
+frontier are trimmed by shifting out the trailing zero bits.
 '''
 def event(heal, i, totalRate, state, probability, next):
     if(heal):
-        st = stringReplace(state, 'x', i)
-        while st[1] == 'x' and st != 'xx':
-            st = st[1:]
-        while st[len(st) - 2] == 'x' and st != 'xx':
-            st = st[:len(st) - 1]
+        st = state & ~(1 << i)
+        if st:
+            st >>= (st & -st).bit_length() - 1
         prob = probability * 1/totalRate
     else:
-        st = stringReplace(state, 'xo' if i == 0 else 'ox' if i == len(state) - 1 else 'o', i)
+        st = state << 1 | 1 if i == -1 else state | 1 << i
         prob = probability * 1/totalRate * λ
     next[st] = next.get(st, 0) + prob
     return next
@@ -52,37 +70,315 @@ state_dict  :   Dictionary with frontier states and associated probabilities
 Returns the expected number of children with the frontier distribution state_dict.
 '''
 def expectation(state_dict):
-    return sum(prob * state.count('o') for state, prob in state_dict.items())
+    return sum(prob * state.bit_count() for state, prob in state_dict.items())
+'''
+state       :   Bitmask of a frontier state
+probability :   The probability of reaching state
+next        :   The dictionary of possible states with probabilities after one more event
+Returns updated next with all events of state accounted for.
+'''
+def expand(state, probability, next):
+    if(state == 0):
+        next[0] = next.get(0, 0) + probability
+        return next
+
+    totalRate = getTotalRate(state)
+    length = state.bit_length()
+    next = event(False, -1, totalRate, state, probability, next)
+    next = event(False, length, totalRate, state, probability, next)
+
+    for i in range(length):
+        if state >> i & 1:
+            next = event(True, i, totalRate, state, probability, next)
+        else:
+            if state >> (i - 1) & 1:
+                next = event(False, i, totalRate, state, probability, next)
+            if state >> (i + 1) & 1:
+                next = event(False, i, totalRate, state, probability, next)
+    return next
+'''
+state_dict  :   Dictionary with frontier states and associated probabilities
+Returns the frontier distribution after one more event.
+'''
+def step(state_dict):
+    next = {}
+    for state, probability in state_dict.items():
+        next = expand(state, probability, next)
+    return merge_mirrors(next)
+class Interval:
+    '''
+    Closed interval [low, high] of nonnegative reals with outward rounding. All rates and probabilities of the frontier
+    expansion are nonnegative, and every floating point operation is correctly rounded, so moving the rounded bounds one
+    float outwards with math.nextafter gives an interval that contains the exact result. Setting λ to an Interval
+    therefore turns getTotalRate, event and expectation into rigorous enclosures, without changing them.
+    '''
+    __slots__ = ('low', 'high')
+
+    def __init__(self, low, high=None):
+        self.low, self.high = low, low if high is None else high
+
+    @staticmethod
+    def lift(other):
+        return other if isinstance(other, Interval) else Interval(other)
+
+    def __add__(self, other):
+        other = Interval.lift(other)
+        return Interval(math.nextafter(self.low + other.low, -math.inf), math.nextafter(self.high + other.high, math.inf))
+
+    __radd__ = __add__
+
+    def __mul__(self, other):
+        other = Interval.lift(other)
+        return Interval(math.nextafter(self.low * other.low, -math.inf), math.nextafter(self.high * other.high, math.inf))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = Interval.lift(other)
+        return Interval(math.nextafter(self.low / other.high, -math.inf), math.nextafter(self.high / other.low, math.inf))
+
+    def __rtruediv__(self, other):
+        return Interval.lift(other) / self
+
+    def __repr__(self):
+        return f"[{self.low!r}, {self.high!r}]"
+'''
+state_dict  :   Dictionary with frontier states and associated probabilities
+remaining   :   The number of events left until the final depth
+Drops the states with probability below prune_threshold, for all values of λ if it is an array, and with frontiers
+longer than prune_length if it is set. Every event adds at most one infected site, so the children of a dropped state at the final depth are at most its
+number of infected sites plus remaining, which bounds the expectation that is lost with it.
+Returns the remaining states and the bound on the lost expectation.
+'''
+def prune(state_dict, remaining):
+    kept, error = {}, 0
+    for state, probability in state_dict.items():
+        upper = probability.high if isinstance(probability, Interval) else np.max(probability)
+        if state and (upper < prune_threshold or (prune_length and state.bit_length() > prune_length)):
+            error = error + probability * (state.bit_count() + remaining)
+        else:
+            kept[state] = probability
+    return kept, error
+'''
+initial     :   Dictionary with the initial frontier states and their probabilities
+depth       :   The number of events
+Generator that runs the dict loop, pruning after every event.
+Yields the expected number of children, the bound on the expectation lost by pruning and the number of states after
+every event.
+'''
+def expansion(initial, depth):
+    next_state = initial
+    for index in range(depth):
+        next_state, lost = prune(step(next_state), depth - index - 1)
+        yield expectation(next_state), lost, len(next_state)
+'''
+state   :   Bitmask of a frontier state
+shards  :   The number of shards
+Returns the shard that owns state. Canonical masks are odd, so we shard on the hash of a tuple, which mixes the bits
+of state the same way in every process.
+'''
+def owner(state, shards):
+    return hash((state,)) % shards
+'''
+shard       :   The shard of this worker
+shards      :   The number of shards
+settings    :   The values of λ, prune_threshold and prune_length of the main process
+initial     :   Dictionary with the initial frontier states and their probabilities
+commands    :   Queue from which the worker receives the number of remaining events of every depth, or None to stop
+inboxes     :   The queues of all workers, through which they send each other the states they own
+results     :   Queue to which the worker sends its part of the expectation, lost expectation and number of states
+Runs one shard of sharded_expansion. The worker keeps the states it owns, expands them, sends every successor to the
+worker that owns it and merges the successors it receives from all workers.
+'''
+def shard_worker(shard, shards, settings, initial, commands, inboxes, results):
+    global λ, prune_threshold, prune_length
+    λ, prune_threshold, prune_length = settings
+    state_dict = {state: probability for state, probability in initial.items() if owner(state, shards) == shard}
+    while (remaining := commands.get()) is not None:
+        next = {}
+        for state, probability in state_dict.items():
+            next = expand(state, probability, next)
+        parts = [{} for _ in range(shards)]
+        for state, probability in next.items():
+            st = canonical(state)
+            part = parts[owner(st, shards)]
+            part[st] = part.get(st, 0) + probability
+        for other in range(shards):
+            if other != shard:
+                inboxes[other].put(parts[other])
+        state_dict = parts[shard]
+        for _ in range(shards - 1):
+            for state, probability in inboxes[shard].get().items():
+                state_dict[state] = state_dict.get(state, 0) + probability
+        state_dict, lost = prune(state_dict, remaining)
+        results.put((expectation(state_dict), lost, len(state_dict)))
+'''
+initial     :   Dictionary with the initial frontier states and their probabilities
+depth       :   The number of events
+workers     :   The number of worker processes
+Version of expansion in which the states are partitioned by their hash over workers persistent worker processes.
+Every event, each worker expands its own states and routes the successors to the workers that own them, so the
+states are spread over the memory of all workers and the main process only sums their results.
+Yields the expected number of children, the bound on the expectation lost by pruning and the number of states after
+every event.
+'''
+def sharded_expansion(initial, depth, workers):
+    commands = [multiprocessing.Queue() for _ in range(workers)]
+    inboxes = [multiprocessing.Queue() for _ in range(workers)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=shard_worker, args=(shard, workers, (λ, prune_threshold, prune_length),
+                                                                    initial, commands[shard], inboxes, results))
+                 for shard in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        for index in range(depth):
+            for command in commands:
+                command.put(depth - index - 1)
+            parts = [results.get() for _ in range(workers)]
+            yield sum(part[0] for part in parts), sum(part[1] for part in parts), sum(part[2] for part in parts)
+    finally:
+        for command in commands:
+            command.put(None)
+        for process in processes:
+            process.join()
+'''
+values      :   Increasing array of values of λ
+children    :   Array with the expected number of children at every value of λ
+Returns the λ at which the expected number of children first crosses 1, interpolated linearly between the values of
+λ around it, or None if it stays below 1.
+'''
+def crossing(values, children):
+    above = np.flatnonzero(children >= 1)
+    if len(above) == 0:
+        return None
+    i = above[0]
+    if i == 0:
+        return values[0]
+    return values[i - 1] + (1 - children[i - 1]) * (values[i] - values[i - 1]) / (children[i] - children[i - 1])
+'''
+low, high   :   Values of λ at which the expectation after depth events is below and above 1
+depth       :   The number of events
+steps       :   The number of bisection steps
+Bisects on λ with interval arithmetic, keeping low at a value at which the expectation is certified to be below 1,
+and high at one where it is certified to be above 1. States are pruned as in the dict loop, and the bound on the lost
+expectation is added to the upper end of the enclosure. The bisection stops early when the enclosure of the
+expectation at the midpoint contains 1, since it can not be decided there.
+Returns low and high.
+'''
+def certify(low, high, depth, steps):
+    global λ
+    for _ in range(steps):
+        middle = (low + high) / 2
+        λ = Interval(middle)
+        next_state, error = initial, Interval(0)
+        for index in range(depth):
+            next_state, lost = prune(step(next_state), depth - index - 1)
+            error = error + lost
+        children = expectation(next_state)
+        if (children + error).high < 1:
+            low = middle
+        elif children.low > 1:
+            high = middle
+        else:
+            break
+    return low, high
+'''
+initial     :   Dictionary with the initial frontier states and their probabilities
+max_length  :   The maximum length of the frontiers that are enumerated
+Enumerates all frontier states of length at most max_length that are reachable from initial, and assembles the
+transition matrix of the jump chain on them. Transitions to longer frontiers are left out, so the rows of those
+states sum to less than one.
+Returns the list of states, the dictionary from state to index and the transition matrix in CSR form.
+'''
+def transition_matrix(initial, max_length):
+    states = list(initial)
+    index = {state: i for i, state in enumerate(states)}
+    rows, cols, data = [], [], []
+    for i, state in enumerate(states):
+        for st, prob in merge_mirrors(expand(state, 1, {})).items():
+            if st.bit_length() > max_length:
+                continue
+            if st not in index:
+                index[st] = len(states)
+                states.append(st)
+            rows.append(i), cols.append(index[st]), data.append(prob)
+    return states, index, csr_array((data, (rows, cols)), shape=(len(states), len(states)))
 '''
 Using the event function, this snippet of code determine and prints the expect number
 of infections after d frontier events. We loop through all states, and to all nodes
 in these states, appending the result of every possible event with the associated
-probability to next.
+probability to next, after which the mirror images of the new states are merged.
+
+If sparse is set, the reachable frontier states of length at most max_length are instead enumerated once, and
+every depth is a single product of the distribution with the transition matrix. Since the length of a frontier grows
+by at most one per event, this is exact up to depth max_length - 1. After that the probability of the longer frontiers
+is dropped, which only lowers the expectation, and is printed as the lost probability. Finally we solve for the
+probability that the frontier dies out before it grows beyond max_length, iteratively since a direct sparse LU
+factorisation of this matrix fills in badly. The sparse mode does not prune and runs in the main process, so it
+ignores prune_threshold, prune_length and workers.
+
+If certified is set, we instead bisect on λ in interval arithmetic for the λ at which the expected number of
+children after d events crosses 1, starting from certified_low and certified_high. The expected number of children is
+rigorously below 1 at the printed lower bound and above 1 at the upper bound.
+
+If λ_grid is set, the dict loop runs once for all values of λ in it at the same time, since the reachable states do
+not depend on λ. The probabilities are then numpy arrays over λ_grid, and at every depth we print the λ at which the
+expected number of children crosses 1, and at the end the expected number of children at every λ.
+
+If workers is set, the dict loop is spread over that many worker processes by sharded_expansion.
+
+If prune_threshold or prune_length is set, the dict loop and the certified mode drop the states with smaller
+probability or longer frontiers after every event, which keeps the number of states bounded at large depth. The
+printed expectation is then a lower bound, and the printed error bounds how much larger the exact expectation can be.
 '''
-next_state = initial
-for index in range(d):
-    next = {}
-    for state in next_state:
-        probability = next_state[state]
-        totalRate = getTotalRate(state)
+sparse = False
+max_length = 18
+certified = False
+certified_low, certified_high, certified_steps = 0.5, 2.0, 30
+prune_threshold, prune_length = 0, None
+λ_grid = None
+workers = 0
+if __name__ == '__main__':
+    if certified:
+        low, high = certify(certified_low, certified_high, d, certified_steps)
+        print("certified: expected children at depth " + str(d - 1) + " below 1 for λ = " + repr(low)
+              + " and above 1 for λ = " + repr(high))
+    elif sparse and λ_grid is None:
+        states, state_index, matrix = transition_matrix(initial, max_length)
+        counts = np.array([state.bit_count() for state in states])
+        distribution = np.zeros(len(states))
+        for state, probability in initial.items():
+            distribution[state_index[state]] = probability
+        transposed = matrix.T.tocsr()
+        for index in range(d):
+            distribution = transposed @ distribution
+            print("expected children at depth " + str(index) + " = " + str(counts @ distribution)
+                  + ", lost probability " + str(1 - distribution.sum()))
 
-        if(state == "xx"):
-            if (state in next):
-                next[state] += probability
+        transient = np.array([state != 0 for state in states])
+        dies = matrix[:, [state_index[0]]].toarray().ravel() if 0 in state_index else np.zeros(len(states))
+        absorption = np.ones(len(states))
+        absorption[transient], info = bicgstab(identity(transient.sum(), format='csr') - matrix[transient][:, transient],
+                                               dies[transient], rtol=1e-13)
+        if info != 0:
+            raise RuntimeError("BiCGSTAB did not converge for the absorption probabilities (info " + str(info) + ")")
+        print("probability of dying out before exceeding length " + str(max_length) + " = "
+              + str(sum(probability * absorption[state_index[state]] for state, probability in initial.items())))
+    else:
+        if λ_grid is not None:
+            λ = np.asarray(λ_grid, dtype=float)
+        error = 0
+        for index, (children, lost, count) in enumerate(sharded_expansion(initial, d, workers) if workers
+                                                        else expansion(initial, d)):
+            error += lost
+            if λ_grid is None:
+                print("expected children at depth " + str(index) + " = " + str(children)
+                      + (", error at most " + str(error) + " over " + str(count) + " states" if error else ""))
             else:
-                next.update({ state :  probability} )  
-        
-        elif(state != "xx"):
-            next = event(False, 0, totalRate, state, probability, next)
-            next = event(False, len(state) - 1, totalRate, state, probability, next)
-
-            for i in range(1, len(state) - 1):
-                if state[i] == 'x':
-                    if state[i - 1] == 'o':
-                        next = event(False, i, totalRate, state, probability, next)
-                    if state[i + 1] == 'o':
-                        next = event(False, i, totalRate, state, probability, next)
-                elif state[i] == 'o':
-                    next = event(True, i, totalRate, state, probability, next)
-    next_state = next
-    print("expected children at depth " + str(index) + " = " + str(expectation(next_state)))
\ No newline at end of file
+                print("expected children at depth " + str(index) + " crosses 1 at λ = " + str(crossing(λ, children))
+                      + (", error at most " + str(np.max(error)) + " over " + str(count) + " states"
+                         if np.any(error) else ""))
+        if λ_grid is not None:
+            for value, expected in zip(λ, children):
+                print("λ = " + str(value) + ": expected children " + str(expected))
@@ -1,19 +1,79 @@
 import numpy as np
 import loky
-from loky import as_completed
-import random
+from loky import wait, FIRST_COMPLETED
 import operator
+import math
+import os
+import json
+import struct
+import tempfile
+from bisect import bisect_left
+from array import array
+try:
+    import numba
+except ImportError:
+    numba = None
 '''
 attemps         :      The total number of contact processes that are tried.
 thres           :      The total number of infections required to declare survival
 max_dimension   :      The largest dimension for which we will determine the critical probability.
+epsilon         :      The width of the bracket at which the bisection for a dimension is finished.
+results_file    :      The file in which the sweep stores the bracket of each dimension, so that it can be resumed.
+sweep_width     :      The number of dimensions for which the sweep runs a bisection at the same time.
+engine          :      Name of the simulator used for the survival runs, 'dict', 'packed', 'batch' or 'jit'.
+workers         :      The number of worker processes, with the batch engine the attempts are split over at most this many batches.
+batch_replicas  :      The smallest number of replicas in a batch, since the lockstep loop of the batch engine only pays off
+                       with many replicas. Fewer runs are done one by one with run_contact_process_jit instead.
+sequential      :      Whether to use sequential testing (crit_value_sequential) instead of crit_value_bisection.
+survival_level  :      In sequential mode, a rate counts as supercritical if the probability to reach thres exceeds this level.
+indifference    :      In sequential mode, the factor around survival_level within which a rate may be decided either way, see
+                       log_likelihood_ratio. Larger factors decide clearly sub- or supercritical rates with fewer runs.
+confidence      :      In sequential mode, the confidence level of the reported interval for the critical value.
+max_attempts    :      In sequential mode, the largest number of contact processes that are tried at a single rate.
+poll_interval   :      The number of steps after which a running contact process checks whether it has been cancelled.
+seed            :      The root seed of all random numbers, a fresh one is drawn from the operating system if None.
+block_size      :      The number of uniforms that the Python engines draw from their generator at once.
+harris          :      Whether to estimate the critical values from survival curves (crit_value_harris) instead of the sweep.
+harris_points   :      The number of rates in the grid of a survival curve.
+harris_replicas :      The number of graphical representations from which a survival curve is estimated.
 '''
 
 attempts = 25
 thres = 500
 max_dimension = 20
+epsilon = 0.001
+results_file = 'critical_values.jsonl'
+sweep_width = 4
 max_steps = np.inf
-neighbour_offset = []
+engine = 'dict'
+workers = 14
+batch_replicas = 64
+sequential = False
+survival_level = 0.04
+indifference = 5
+confidence = 0.95
+max_attempts = 1000
+poll_interval = 1000
+seed = None
+block_size = 4096
+harris = False
+harris_points = 41
+harris_replicas = 500
+'''
+cancel      :    Pair (path, round_id) identifying a cancellation flag, or None
+Runs that are no longer needed are cancelled cooperatively through a file of flags, one byte per round, which the
+workers map into memory. A running contact process checks the byte of its round every poll_interval steps, and stops
+early when it is set. The mapping of the current flag file is cached per worker process.
+Returns True if the round of cancel has been cancelled.
+'''
+cancel_flags = {}
+def cancelled(cancel):
+    path, round_id = cancel
+    if path not in cancel_flags:
+        cancel_flags.clear()
+        cancel_flags[path] = np.memmap(path, dtype=np.uint8, mode='r')
+    return cancel_flags[path][round_id] != 0
+
 '''
 Node object to represent each node in the contact process
 Each node has an infected status and a count of uninfected neighbours
@@ -22,64 +82,156 @@ class Node:
     def __init__(self, infected = True, uninfected_neighbours=2):
         self.infected = infected
         self.uninfected_neighbours = uninfected_neighbours
+        self.bucket_index = -1
     def __repr__(self):
         return f"Node(infected={self.infected}, uninfected_neighbours={self.uninfected_neighbours})"
 '''
+Infected nodes are kept in buckets by their number of uninfected neighbours, which is between 0 and 2d.
+buckets             :    List of 2d + 1 lists, buckets[c] holds the keys of infected nodes with c uninfected neighbours
+contact_process     :    Dictionary representing the current state of the system
+key                 :    Key of the infected node to add, remove or move
+Each node remembers its position in its bucket, so that all three operations are O(1).
+'''
+def bucket_add(buckets, contact_process, key):
+    node = contact_process[key]
+    bucket = buckets[node.uninfected_neighbours]
+    node.bucket_index = len(bucket)
+    bucket.append(key)
+
+def bucket_remove(buckets, contact_process, key):
+    node = contact_process[key]
+    bucket = buckets[node.uninfected_neighbours]
+    last = bucket.pop()
+    if last != key:
+        bucket[node.bucket_index] = last
+        contact_process[last].bucket_index = node.bucket_index
+    node.bucket_index = -1
+
+def bucket_move(buckets, contact_process, key, change):
+    bucket_remove(buckets, contact_process, key)
+    contact_process[key].uninfected_neighbours += change
+    bucket_add(buckets, contact_process, key)
+'''
+buckets     :    The buckets of infected nodes
+stream      :    The stream of uniforms of the run, see random_stream
+Picks an infected node with probability proportional to its number of uninfected neighbours.
+We first choose a bucket with probability proportional to c * len(buckets[c]), and then a uniform key in that bucket.
+This costs O(d) instead of O(n) for random.choices over all infected nodes.
+'''
+def bucket_choice(buckets, stream):
+    total = sum(count * len(bucket) for count, bucket in enumerate(buckets))
+    target = min(int(next(stream) * total), total - 1)
+    for count, bucket in enumerate(buckets):
+        weight = count * len(bucket)
+        if target < weight:
+            return bucket[target // count]
+        target -= weight
+'''
+Every run gets its own numpy Generator, seeded with a SeedSequence that is derived from the root seed and the task, see
+task_seed. The Python engines do not ask the generator for every single random number, but read uniforms from
+random_stream, which refills a buffer of block_size uniforms at once. Integers below n are drawn as int(u * n).
+'''
+root_seed = np.random.SeedSequence(seed)
+
+def random_stream(seed):
+    generator = np.random.default_rng(seed)
+    while True:
+        yield from generator.random(block_size).tolist()
+
+'''
+dimension   :    Dimension of the graph Z^d
+rate        :    The rate of infection
+batch       :    The number of the batch of runs within its round
+index       :    The number of the run within its batch
+The spawn key of the SeedSequence is made from the task itself rather than from a counter, so a task gets the same
+seed however the rounds are scheduled. A specific (slow) run can be replayed by passing this seed to its engine, e.g.
+run_contact_process(rate, dimension, seed=task_seed(dimension, rate, batch, index)), with the same root seed.
+Returns the SeedSequence of the task
+'''
+def task_seed(dimension, rate, batch, index):
+    rate_bits = struct.unpack('<Q', struct.pack('<d', rate))[0]
+    return np.random.SeedSequence(root_seed.entropy, spawn_key=(dimension, rate_bits, batch, index))
+
+'''
+dimension   :    Dimension of the graph Z^d
+Returns the list of the 2d offsets from a site of Z^d to its neighbours.
+'''
+def neighbour_offsets(dimension):
+    offsets = []
+    for i in range(dimension):
+        for offset in [1, -1]:
+            offsets.append([offset if j == i else 0 for j in range(dimension)])
+    return offsets
+'''
 Runs one timestep of the contact process
 total_infections    :    Total number of infections in the system
 total_rate          :    Total rate of infection in the system
 key_list            :    List of keys representing the current state of the system
 contact_process     :    Dictionary representing the current state of the system
+buckets             :    The infected nodes bucketed by their number of uninfected neighbours
 rate                :    The rate of infection
+offsets             :    The offsets from a site to its neighbours, see neighbour_offsets
+stream              :    The stream of uniforms of the run, see random_stream
 Returns the updated list of keys, contact process, total infections, and total rate
 '''
-def time_step(total_infections, total_rate, key_list, contact_process, rate):
-    infection = np.random.uniform(0, 1) < total_rate / (total_infections + total_rate)
+def time_step(total_infections, total_rate, key_list, contact_process, buckets, rate, offsets, stream):
+    infection = next(stream) < total_rate / (total_infections + total_rate)
     if(not infection):
-        index = np.random.randint(0, len(key_list))
+        index = int(next(stream) * len(key_list))
         toheal = key_list[index]
+        bucket_remove(buckets, contact_process, toheal)
         contact_process[toheal].infected = False
         total_rate -= contact_process[key_list[index]].uninfected_neighbours * rate
         total_infections -= 1
-        for offset in neighbour_offset:
+        for offset in offsets:
             neighbour_key = tuple(map(operator.add, key_list[index], offset))
-            contact_process[neighbour_key].uninfected_neighbours += 1 
             if contact_process[neighbour_key].infected:
+                bucket_move(buckets, contact_process, neighbour_key, 1)
                 total_rate += rate
+            else:
+                contact_process[neighbour_key].uninfected_neighbours += 1
         key_list[index] = key_list[-1]
         key_list.pop()
     elif(infection):
         options = []
-        infect = random.choices(key_list, weights=[contact_process[key].uninfected_neighbours for key in key_list], k=1)[0]
-        for offset in neighbour_offset:
+        infect = bucket_choice(buckets, stream)
+        for offset in offsets:
             neighbour_key = tuple(map(operator.add, infect, offset))
             if neighbour_key in contact_process and not contact_process[neighbour_key].infected:
                 options.append(neighbour_key)
 
-        new = np.random.randint(0,len(options))
+        new = int(next(stream) * len(options))
         contact_process[options[new]].infected = True
+        bucket_add(buckets, contact_process, options[new])
         total_rate += contact_process[options[new]].uninfected_neighbours * rate
         total_infections += 1
         key_list.append(options[new])
-        for offset in neighbour_offset:
+        for offset in offsets:
             neighbour_key = tuple(map(operator.add, options[new], offset))
             if neighbour_key not in contact_process:
-                contact_process[neighbour_key] = Node(False, 2*dimension - 1)
+                contact_process[neighbour_key] = Node(False, len(offsets) - 1)
+            elif contact_process[neighbour_key].infected:
+                bucket_move(buckets, contact_process, neighbour_key, -1)
+                total_rate -= rate
             else:
                 contact_process[neighbour_key].uninfected_neighbours -= 1
-                if contact_process[neighbour_key].infected:
-                    total_rate -= rate
     return total_infections, total_rate, key_list, contact_process
 
 ''' 
 Threshold   :    The threshold for the number of infections
 dimension   :    Dimension of the graph Z^d
+cancel      :    The cancellation flag of the round of this run, see cancelled
+seed        :    The seed of the run, see task_seed
+stats       :    Optional dictionary in which the number of events and of allocated sites of the run are stored. There
+                 are no failed infection attempts, so every event changes the state, and a site is allocated once it
+                 is infected or next to an infected site.
 Run one iteration of the contact process until the number of infections is greater than 100 or smaller or equal to 0
-Returns True if the number of infections is greater than or equal to the threshold, False otherwise
+Returns True if the number of infections is greater than or equal to the threshold, False otherwise, and None if the
+run was cancelled
 '''
 ti = 0
 tr = 0
-def run_contact_process(rate, dimension):
+def run_contact_process(rate, dimension, cancel=None, seed=None, stats=None):
     akeys_lst = []
     akeys_lst.append(tuple((0 for _ in range(dimension))))
     cprocess = {tuple([0 for _ in range(dimension)]): Node(True, 2*dimension)}
@@ -87,58 +239,811 @@ def run_contact_process(rate, dimension):
         for offset in [1, -1]:
             neighbour_key = tuple(tuple((0 for _ in range(dimension)))[j] + (offset if j == i else 0) for j in range(dimension))
             cprocess[neighbour_key] = Node(False, 2*dimension - 1)
+    buckets = [[] for _ in range(2*dimension + 1)]
+    bucket_add(buckets, cprocess, akeys_lst[0])
+    offsets = neighbour_offsets(dimension)
+    stream = random_stream(seed)
     ti = 1
     tr = 2 * rate * dimension
     steps = 0
     while ti < thres and ti > 0 and steps < max_steps:
         steps += 1
-        ti, tr, akeys_lst, cprocess = time_step(ti,tr,akeys_lst, cprocess, rate)
+        if cancel is not None and steps % poll_interval == 0 and cancelled(cancel):
+            return None
+        ti, tr, akeys_lst, cprocess = time_step(ti,tr,akeys_lst, cprocess, buckets, rate, offsets, stream)
+    if stats is not None:
+        stats.update(events=steps, sites=len(cprocess))
     if ti >= thres:
         return True 
     return False
 
+'''
+radix   :   The base of the mixed-radix encoding of the sites of Z^d.
+A site x is packed into the single integer sum(x_i * radix^i). Since the digits x_i are balanced (|x_i| < radix/2)
+this encoding is injective, and the neighbour of a site in direction ±e_i is found by adding ±radix^i.
+'''
+radix = 2**32
+
+'''
+Bucket operations for the packed engine, these mirror bucket_add, bucket_remove and bucket_move but work on slots
+indexing the flat buffers uninfected and bucket_index instead of on Node objects.
+'''
+def packed_bucket_add(buckets, uninfected, bucket_index, slot):
+    bucket = buckets[uninfected[slot]]
+    bucket_index[slot] = len(bucket)
+    bucket.append(slot)
+
+def packed_bucket_remove(buckets, uninfected, bucket_index, slot):
+    bucket = buckets[uninfected[slot]]
+    last = bucket.pop()
+    if last != slot:
+        bucket[bucket_index[slot]] = last
+        bucket_index[last] = bucket_index[slot]
+
+def packed_bucket_move(buckets, uninfected, bucket_index, slot, change):
+    packed_bucket_remove(buckets, uninfected, bucket_index, slot)
+    uninfected[slot] += change
+    packed_bucket_add(buckets, uninfected, bucket_index, slot)
+
+'''
+rate        :    The rate of infection
+dimension   :    Dimension of the graph Z^d
+Array-backed version of run_contact_process with the same contract.
+Every visited site gets a slot: slots maps its packed key to the slot, and the flat buffers site_keys, infected,
+uninfected and bucket_index hold the state of the site. The infected sites are stored as a list of slots.
+Instead of the float total_rate we keep weight, the total number of uninfected neighbours of infected sites,
+so that the total rate of infection is rate * weight. The seed and stats are used as in run_contact_process.
+Returns True if the number of infections reaches the threshold, False otherwise, and None if the run was cancelled
+'''
+def run_contact_process_packed(rate, dimension, cancel=None, seed=None, stats=None):
+    stream = random_stream(seed)
+    offsets = []
+    for i in range(dimension):
+        offsets += [radix**i, -radix**i]
+    slots = {0: 0}
+    site_keys = [0]
+    infected = array('b', [1])
+    uninfected = array('i', [2*dimension])
+    bucket_index = array('i', [0])
+    for offset in offsets:
+        slots[offset] = len(site_keys)
+        site_keys.append(offset)
+        infected.append(0)
+        uninfected.append(2*dimension - 1)
+        bucket_index.append(-1)
+    buckets = [[] for _ in range(2*dimension + 1)]
+    buckets[2*dimension].append(0)
+    infected_slots = [0]
+    ti = 1
+    weight = 2*dimension
+    steps = 0
+    while ti < thres and ti > 0 and steps < max_steps:
+        steps += 1
+        if cancel is not None and steps % poll_interval == 0 and cancelled(cancel):
+            return None
+        if next(stream) * (ti + rate * weight) < ti:
+            index = int(next(stream) * ti)
+            slot = infected_slots[index]
+            packed_bucket_remove(buckets, uninfected, bucket_index, slot)
+            infected[slot] = 0
+            weight -= uninfected[slot]
+            ti -= 1
+            key = site_keys[slot]
+            for offset in offsets:
+                neighbour = slots[key + offset]
+                if infected[neighbour]:
+                    packed_bucket_move(buckets, uninfected, bucket_index, neighbour, 1)
+                    weight += 1
+                else:
+                    uninfected[neighbour] += 1
+            infected_slots[index] = infected_slots[-1]
+            infected_slots.pop()
+        else:
+            target = min(int(next(stream) * weight), weight - 1)
+            for count, bucket in enumerate(buckets):
+                if target < count * len(bucket):
+                    key = site_keys[bucket[target // count]]
+                    break
+                target -= count * len(bucket)
+            options = [key + offset for offset in offsets if not infected[slots[key + offset]]]
+            key = options[int(next(stream) * len(options))]
+            slot = slots[key]
+            infected[slot] = 1
+            packed_bucket_add(buckets, uninfected, bucket_index, slot)
+            weight += uninfected[slot]
+            ti += 1
+            infected_slots.append(slot)
+            for offset in offsets:
+                neighbour = slots.get(key + offset)
+                if neighbour is None:
+                    slots[key + offset] = len(site_keys)
+                    site_keys.append(key + offset)
+                    infected.append(0)
+                    uninfected.append(2*dimension - 1)
+                    bucket_index.append(-1)
+                elif infected[neighbour]:
+                    packed_bucket_move(buckets, uninfected, bucket_index, neighbour, -1)
+                    weight -= 1
+                else:
+                    uninfected[neighbour] -= 1
+    if stats is not None:
+        stats.update(events=steps, sites=len(site_keys))
+    return ti >= thres
+
+'''
+Vectorised hash tables for run_contact_process_batch, one row of size 2^bits per replica, stored flat so that slot j
+of replica r is at position r * 2^bits + j of table and state. A slot is empty (state 0), holds an infected site
+(state 1) or a site that was infected before and has healed (state 2). Healed sites are kept, so there are no
+deletions, and the tables are doubled once one of them is half full.
+keys        :    The keys of the lookups
+shift       :    64 - bits
+Returns the home slot of every key within its row, from the multiplicative hash of hash_slot
+'''
+def batch_slot(keys, shift):
+    return ((keys * np.uint64(11400714819323198485)) >> shift).astype(np.int64)
+
+'''
+rows        :    The position of the row of every lookup, r * 2^bits
+keys        :    The keys of the lookups
+All lookups probe linearly from their home slot at once, wrapping around within their row, until each of them finds
+its key or an empty slot.
+Returns the position of every key
+'''
+def batch_find(table, state, rows, keys, shift):
+    mask = 2**(64 - int(shift)) - 1
+    positions = rows + batch_slot(keys, shift)
+    probing = np.nonzero((state[positions] != 0) & (table[positions] != keys))[0]
+    while probing.size > 0:
+        positions[probing] = (positions[probing] & ~mask) | ((positions[probing] + 1) & mask)
+        found = (state[positions[probing]] == 0) | (table[positions[probing]] == keys[probing])
+        probing = probing[~found]
+    return positions
+
+'''
+replicas    :    The number of rows of the tables
+Moves the sites of all replicas into tables with rows of twice the size. All sites are placed at once: in every round
+each site that is not placed yet claims its current slot, the first claim of a free slot wins, and all other sites
+move on to the next slot.
+Returns the new table, state and shift, and for every old position the new position of its site
+'''
+def batch_grow(table, state, shift, replicas):
+    size = 2 * (table.size // replicas)
+    shift = np.uint64(int(shift) - 1)
+    old_positions = np.flatnonzero(state)
+    keys = table[old_positions]
+    rows = old_positions // (size // 2) * size
+    grown_table = np.zeros(replicas * size, dtype=np.uint64)
+    grown_state = np.zeros(replicas * size, dtype=np.uint8)
+    moved = np.zeros(table.size, dtype=np.int64)
+    positions = rows + batch_slot(keys, shift)
+    pending = np.arange(keys.size)
+    while pending.size > 0:
+        wins = np.zeros(pending.size, dtype=bool)
+        wins[np.unique(positions[pending], return_index=True)[1]] = True
+        wins &= grown_state[positions[pending]] == 0
+        placed = pending[wins]
+        grown_table[positions[placed]] = keys[placed]
+        grown_state[positions[placed]] = state[old_positions[placed]]
+        moved[old_positions[placed]] = positions[placed]
+        pending = pending[~wins]
+        positions[pending] = rows[pending] + ((positions[pending] + 1) & (size - 1))
+    return grown_table, grown_state, shift, moved
+
+'''
+rate        :    The rate of infection
+dimension   :    Dimension of the graph Z^d
+replicas    :    The number of independent contact processes that are run together
+Runs many contact processes in lockstep using NumPy, with one row per replica.
+Sites are hashed to a 64-bit key sum(x_i * h_i) for random odd multipliers h_i, so that the neighbour in direction
+±e_i is found by adding ±h_i (with wrap-around). Two different sites collide only with negligible probability.
+The sites of replica r live in row r of the hash tables of batch_find, and row r of infected holds the positions of
+its count[r] infected sites in these tables, so an infection attempt costs one vectorised probe instead of a scan of
+all infected sites.
+Every step each active replica has one event: with probability 1 / (1 + 2d * rate) a uniform infected site heals,
+otherwise a uniform infected site tries to infect a uniform neighbour, which does nothing if that neighbour is already
+infected. This is the jump chain of run_contact_process with added self-loops, so survival has the same law.
+Replicas are retired as soon as they die out or reach the threshold.
+The random numbers of the whole batch come from one generator seeded with seed, and are drawn as arrays.
+If stats is given, the total number of events of all replicas that changed their state, so without the failed
+infection attempts, and the number of distinct sites they infected are stored in it.
+Returns an array of booleans, True for every replica that reached the threshold, or None if the batch was cancelled.
+'''
+def run_contact_process_batch(rate, dimension, replicas, cancel=None, seed=None, stats=None):
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(0, 2**63, size=dimension, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    offsets = np.concatenate((multipliers, np.uint64(0) - multipliers))
+    bits = (2*thres - 1).bit_length()
+    shift = np.uint64(64 - bits)
+    table = np.zeros(replicas * 2**bits, dtype=np.uint64)
+    state = np.zeros(replicas * 2**bits, dtype=np.uint8)
+    infected = np.repeat(np.arange(replicas) * 2**bits + batch_slot(np.zeros(1, dtype=np.uint64), shift), thres)
+    state[infected[::thres]] = 1
+    count = np.ones(replicas, dtype=np.int64)
+    stored = np.ones(replicas, dtype=np.int64)
+    heal_probability = 1 / (1 + 2*dimension*rate)
+    active = np.arange(replicas)
+    steps = 0
+    events = 0
+    while active.size > 0 and steps < max_steps:
+        steps += 1
+        if cancel is not None and steps % poll_interval == 0 and cancelled(cancel):
+            return None
+        uniforms = rng.random((3, active.size))
+        index = active * thres + (uniforms[0] * count[active]).astype(np.int64)
+        heal = uniforms[1] < heal_probability
+
+        healing = active[heal]
+        state[infected[index[heal]]] = 2
+        infected[index[heal]] = infected[healing * thres + count[healing] - 1]
+        count[healing] -= 1
+
+        infecting = active[~heal]
+        source = infected[index[~heal]]
+        target = table[source] + offsets[(uniforms[2, ~heal] * (2*dimension)).astype(np.int64)]
+        positions = batch_find(table, state, source & -(table.size // replicas), target, shift)
+        found = state[positions]
+        new = found == 0
+        table[positions[new]] = target[new]
+        stored[infecting[new]] += 1
+        infecting, positions = infecting[found != 1], positions[found != 1]
+        state[positions] = 1
+        infected[infecting * thres + count[infecting]] = positions
+        count[infecting] += 1
+        events += healing.size + infecting.size
+
+        active = active[(count[active] > 0) & (count[active] < thres)]
+        if 2*stored.max() > table.size // replicas:
+            table, state, shift, moved = batch_grow(table, state, shift, replicas)
+            infected = moved[infected]
+    if stats is not None:
+        stats.update(events=events, sites=int(stored.sum()))
+    return count >= thres
+
+'''
+Optional compiled kernel for the event loop, which is only defined when numba is installed.
+It uses the same hashed keys and self-loop jump chain as run_contact_process_batch, but for a single process and with
+the sites stored in an open-addressing hash table with linear probing, so no dicts or tuples are involved. As in
+batch_find a slot is empty (state 0), infected (1) or healed (2), and the table is doubled once it is half full. This
+happens outside the inner loop, since replacing the arrays inside it keeps numba from optimising the loop.
+The kernel draws from numba's own random generator, which is seeded with seed at the start of each run.
+Every poll_interval steps it reads the byte round_id of flags, and it returns -1 if this cancellation flag is set.
+Besides 1 (survived) or 0 (died) it returns the number of events that changed the state, so without the failed
+infection attempts, and the number of distinct sites that were infected.
+The compiled code is cached on disk with cache=True, so that the loky workers load it instead of compiling it again.
+'''
+if numba is not None:
+    @numba.njit(cache=True)
+    def hash_slot(key, shift):
+        return np.int64((key * np.uint64(11400714819323198485)) >> shift)
+
+    @numba.njit(cache=True)
+    def hash_find(table, state, key, shift):
+        mask = len(table) - 1
+        i = hash_slot(key, shift)
+        while state[i] != 0 and table[i] != key:
+            i = (i + 1) & mask
+        return i
+
+    @numba.njit(cache=True)
+    def hash_grow(table, state, shift):
+        shift = np.uint64(shift - np.uint64(1))
+        grown_table = np.zeros(2*len(table), dtype=np.uint64)
+        grown_state = np.zeros(2*len(table), dtype=np.uint8)
+        for i in range(len(table)):
+            if state[i] != 0:
+                j = hash_find(grown_table, grown_state, table[i], shift)
+                grown_table[j] = table[i]
+                grown_state[j] = state[i]
+        return grown_table, grown_state, shift
+
+    @numba.njit(cache=True)
+    def contact_process_kernel(rate, dimension, thres, max_steps, seed, flags, round_id, poll_interval):
+        np.random.seed(seed)
+        offsets = np.empty(2*dimension, dtype=np.uint64)
+        for i in range(dimension):
+            multiplier = np.uint64(1)
+            for _ in range(4):
+                multiplier = (multiplier << np.uint64(16)) ^ np.uint64(np.random.randint(0, 65536))
+            offsets[2*i] = multiplier | np.uint64(1)
+            offsets[2*i + 1] = np.uint64(0) - offsets[2*i]
+        bits = 1
+        while 2**bits < 4*thres:
+            bits += 1
+        shift = np.uint64(64 - bits)
+        table = np.zeros(2**bits, dtype=np.uint64)
+        state = np.zeros(2**bits, dtype=np.uint8)
+        infected = np.zeros(thres, dtype=np.uint64)
+        state[hash_find(table, state, infected[0], shift)] = 1
+        stored = 1
+        heal_probability = 1 / (1 + 2*dimension*rate)
+        ti = 1
+        steps = 0
+        events = 0
+        while ti < thres and ti > 0 and steps < max_steps:
+            if 2*stored > len(table):
+                table, state, shift = hash_grow(table, state, shift)
+            while ti < thres and ti > 0 and steps < max_steps and 2*stored <= len(table):
+                steps += 1
+                if steps % poll_interval == 0 and flags[round_id] != 0:
+                    return -1, events, stored
+                index = np.random.randint(0, ti)
+                if np.random.random() < heal_probability:
+                    state[hash_find(table, state, infected[index], shift)] = 2
+                    infected[index] = infected[ti - 1]
+                    ti -= 1
+                    events += 1
+                else:
+                    target = infected[index] + offsets[np.random.randint(0, 2*dimension)]
+                    i = hash_find(table, state, target, shift)
+                    if state[i] != 1:
+                        if state[i] == 0:
+                            table[i] = target
+                            stored += 1
+                        state[i] = 1
+                        infected[ti] = target
+                        ti += 1
+                        events += 1
+        return (1 if ti >= thres else 0), events, stored
+
+'''
+rate        :    The rate of infection
+dimension   :    Dimension of the graph Z^d
+cancel      :    The cancellation flag of the round of this run, see cancelled
+seed        :    The seed of the run, see task_seed, from which the integer seed of the kernel is generated
+stats       :    Optional dictionary in which the number of events and of distinct infected sites are stored
+Runs one contact process with the compiled kernel, and falls back to run_contact_process_packed if numba is unavailable.
+Without cancel the kernel gets a read-only flag array, like the mapping of a flag file in cancelled, so that both calls
+share one compiled signature and a warm-up run in the main process leaves nothing for the workers to compile.
+Returns True if the number of infections reaches the threshold, False otherwise, and None if the run was cancelled
+'''
+def run_contact_process_jit(rate, dimension, cancel=None, seed=None, stats=None):
+    if numba is None:
+        return run_contact_process_packed(rate, dimension, cancel, seed, stats)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seed = int(seed.generate_state(1)[0])
+    flags, round_id = np.zeros(1, dtype=np.uint8), 0
+    flags.flags.writeable = False
+    if cancel is not None:
+        cancelled(cancel)
+        flags, round_id = np.asarray(cancel_flags[cancel[0]]), cancel[1]
+    result, events, sites = contact_process_kernel(rate, dimension, thres, max_steps, seed, flags, round_id, poll_interval)
+    if stats is not None:
+        stats.update(events=events, sites=sites)
+    return None if result < 0 else result == 1
+
+engines = {'dict': run_contact_process, 'packed': run_contact_process_packed, 'batch': run_contact_process_batch,
+           'jit': run_contact_process_jit}
+
+'''
+rates       :    Increasing list of rates of infection
+dimension   :    Dimension of the graph Z^d
+cancel      :    The cancellation flag of the round of this run, see cancelled
+seed        :    The seed of the run, see task_seed
+stats       :    Optional dictionary in which the number of events that changed a level and of distinct sites ever
+                 infected are stored. The infected sites are only remembered when stats is given, since pruning
+                 would otherwise keep the memory bounded
+Runs the contact processes for all rates at once on a single graphical (Harris) representation: every site has a
+recovery clock of rate 1, and every directed edge an infection clock of rate top whose arrows carry a uniform mark in
+[0, top]. The process with rate λ uses the arrows with mark at most λ, which couples the processes monotonically.
+For every site we keep level[x], the smallest rate for which x is infected, so x is infected in the process with
+rate λ if and only if level[x] <= λ. A recovery at x removes x, and an arrow from y to x with mark u lowers level[x]
+to max(level[y], u). Sites are packed as in run_contact_process_packed.
+per_level[k] counts the sites whose level lies in (rates[k - 1], rates[k]], so the number of infections of the
+process with rate rates[k] is the sum of per_level up to k. The rates with index below lo have died out and those
+with index at least hi have reached the threshold. The sites that only matter for the latter are dropped, and top is
+lowered to the largest undecided rate, which by thinning leaves the arrows of the undecided processes unchanged.
+Returns a list with for every rate True if its process reached the threshold, False otherwise, and None if the run
+was cancelled
+'''
+def run_contact_process_harris(rates, dimension, cancel=None, seed=None, stats=None):
+    stream = random_stream(seed)
+    offsets = []
+    for i in range(dimension):
+        offsets += [radix**i, -radix**i]
+    level = {0: 0.0}
+    sites = [0]
+    per_level = [0] * len(rates)
+    per_level[0] = 1
+    survived = [False] * len(rates)
+    lo, hi = 0, len(rates)
+    steps = 0
+    events = 0
+    visited = {0} if stats is not None else None
+    while lo < hi and steps < max_steps:
+        steps += 1
+        if cancel is not None and steps % poll_interval == 0 and cancelled(cancel):
+            return None
+        top = rates[hi - 1]
+        index = int(next(stream) * len(sites))
+        key = sites[index]
+        if next(stream) * (1 + 2*dimension*top) < 1:
+            per_level[bisect_left(rates, level.pop(key))] -= 1
+            sites[index] = sites[-1]
+            sites.pop()
+            events += 1
+        else:
+            infection_level = max(level[key], next(stream) * top)
+            key += offsets[int(next(stream) * len(offsets))]
+            if key not in level:
+                if visited is not None:
+                    visited.add(key)
+                level[key] = infection_level
+                per_level[bisect_left(rates, infection_level)] += 1
+                sites.append(key)
+                events += 1
+            elif infection_level < level[key]:
+                per_level[bisect_left(rates, level[key])] -= 1
+                level[key] = infection_level
+                per_level[bisect_left(rates, infection_level)] += 1
+                events += 1
+        if len(sites) >= thres:
+            while lo < hi and sum(per_level[lo:hi]) >= thres:
+                hi -= 1
+                survived[hi] = True
+                per_level[hi] = 0
+            sites = [site for site in sites if bisect_left(rates, level[site]) < hi]
+            level = {site: level[site] for site in sites}
+        while lo < hi and per_level[lo] == 0:
+            lo += 1
+    if stats is not None:
+        stats.update(events=events, sites=len(visited))
+    return survived
+
+'''
+rates       :    Increasing list of rates of infection
+dimension   :    Dimension of the graph Z^d
+replicas    :    The number of graphical representations
+Estimates the survival curve, the probability to reach thres as a function of the rate, from replicas graphical
+representations that each decide all rates at once, see run_contact_process_harris. The critical value is estimated
+as the smallest rate whose survival probability exceeds survival_level.
+Returns the survival probabilities and the estimate of the critical value (None if no rate exceeds survival_level)
+'''
+def survival_curve(rates, dimension, replicas):
+    rates = sorted(rates)
+    with loky.get_reusable_executor(max_workers=workers) as executor:
+        futures = [executor.submit(run_contact_process_harris, rates, dimension, None,
+                                   task_seed(dimension, rates[-1], 0, index)) for index in range(replicas)]
+        survivals = np.sum([future.result() for future in futures], axis=0)
+    probabilities = survivals / replicas
+    supercritical = np.flatnonzero(probabilities > survival_level)
+    return probabilities, (rates[supercritical[0]] if supercritical.size > 0 else None)
+
+'''
+low         :    The lower bound for the critical value
+high        :    The upper bound for the critical value
+points      :    The number of rates in the grid between low and high
+replicas    :    The number of graphical representations
+dimension   :    Dimension of the graph Z^d
+Estimates the critical value from one survival curve on a grid of rates, instead of re-simulating at every midpoint.
+If the grid does not bracket the critical value, a warning is printed and the missing end of the bracket is open:
+infinite when no rate exceeds survival_level, and 0 when already the first rate does.
+Returns upper and lower estimate for the critical value, the grid points around the estimate
+'''
+def crit_value_harris(low, high, points, replicas, dimension):
+    rates = np.linspace(low, high, points).tolist()
+    probabilities, critical_value = survival_curve(rates, dimension, replicas)
+    for rate, probability in zip(rates, probabilities):
+        print(f"Dimension {dimension}: survival probability {probability:.4f} at rate {rate:.6f}.")
+    if critical_value is None:
+        print(f"Dimension {dimension}: no rate up to {high:.6f} exceeds the survival level, the critical value is above it.")
+        return math.inf, high
+    index = rates.index(critical_value)
+    if index == 0:
+        print(f"Dimension {dimension}: already rate {low:.6f} exceeds the survival level, the critical value is below it.")
+        return critical_value, 0.0
+    return critical_value, rates[index - 1]
+
+'''
+executor    :    The executor to submit the runs to
+rate        :    The rate of infection
+dimension   :    Dimension of the graph Z^d
+runs        :    The number of contact processes to run
+cancel      :    The cancellation flag shared by these runs, see cancelled
+batch       :    The number of this batch of runs within its round, which is part of the seed of every run
+Submits runs contact processes with the selected engine, with the batch engine they are split over at most workers
+batches of at least batch_replicas replicas. With fewer runs the batch engine is slower than running them one by one
+on all workers, so they are then run by run_contact_process_jit (the packed engine if numba is unavailable), which
+simulates the same self-loop chain.
+Every task is seeded with task_seed.
+Returns the set of futures, each with a survived boolean or an array of them as result.
+'''
+def submit_runs(executor, rate, dimension, runs, cancel=None, batch=0):
+    if engine == 'batch' and runs >= batch_replicas:
+        batches = max(1, min(workers, runs // batch_replicas))
+        return {executor.submit(run_contact_process_batch, rate, dimension, len(replicas), cancel,
+                                task_seed(dimension, rate, batch, index))
+                for index, replicas in enumerate(np.array_split(np.arange(runs), batches))}
+    run = run_contact_process_jit if engine == 'batch' else engines[engine]
+    return {executor.submit(run, rate, dimension, cancel, task_seed(dimension, rate, batch, index))
+            for index in range(runs)}
+
+'''
+Flags object that hands out the cancellation flags of rounds, see cancelled.
+The flags live in a temporary file with one byte per round. Round ids are reused cyclically, so size has to exceed
+the number of rounds that are alive at the same time. It is a context manager that removes the file on exit, also when
+a sweep is interrupted.
+'''
+class CancelFlags:
+    def __init__(self, size=1024):
+        descriptor, self.path = tempfile.mkstemp(suffix='.cancel')
+        os.close(descriptor)
+        self.flags = np.memmap(self.path, dtype=np.uint8, mode='w+', shape=(size,))
+        self.next_id = 0
+    def new(self):
+        round_id = self.next_id
+        self.flags[round_id] = 0
+        self.next_id = (self.next_id + 1) % len(self.flags)
+        return (self.path, round_id)
+    def set(self, cancel):
+        self.flags[cancel[1]] = 1
+        self.flags.flush()
+    def close(self):
+        del self.flags
+        os.remove(self.path)
+    def __enter__(self):
+        return self
+    def __exit__(self, *exception):
+        self.close()
+
+'''
+Round object for the contact processes that are run at one rate in a bisection.
+A round is decided as survived once any of its runs reaches the threshold, and as died once all runs have died out.
+'''
+class Round:
+    def __init__(self, executor, rate, dimension, attempts, cancel):
+        self.executor = executor
+        self.rate = rate
+        self.dimension = dimension
+        self.attempts = attempts
+        self.cancel = cancel
+        self.pending = submit_runs(executor, rate, dimension, attempts, cancel)
+        self.batches = 1
+        self.survived = None
+        self.undecided = False
+        self.runs = 0
+    def __repr__(self):
+        return f"Round(rate={self.rate}, survived={self.survived}, pending={len(self.pending)})"
+    def collect(self):
+        done = {future for future in self.pending if future.done()}
+        self.pending -= done
+        results = [future.result() for future in done]
+        self.runs += sum(np.size(result) for result in results)
+        return results
+    def update(self):
+        if any(np.any(result) for result in self.collect()):
+            self.survived = True
+        elif not self.pending and self.survived is None:
+            self.survived = False
+    def stop(self, flags):
+        flags.set(self.cancel)
+        for future in self.pending:
+            future.cancel()
+
+'''
+survived    :    The number of contact processes that reached the threshold
+total       :    The total number of contact processes
+The sequential test is Wald's sequential probability ratio test of survival probability survival_level / indifference
+against survival_level * indifference, which needs survival_level * indifference < 1.
+Returns the log likelihood ratio of the larger against the smaller survival probability.
+'''
+def log_likelihood_ratio(survived, total):
+    low, high = survival_level / indifference, survival_level * indifference
+    return survived * math.log(high / low) + (total - survived) * math.log((1 - high) / (1 - low))
+
+'''
+Round for sequential testing, which runs batches of attempts contact processes until the log likelihood ratio of all
+its runs crosses log((1 - alpha) / alpha), which decides survived, or log(alpha / (1 - alpha)), which decides died.
+By Wald's bounds a rate with survival probability at most survival_level / indifference is decided as survived, and
+one with at least survival_level * indifference as died, with probability at most alpha. The ratio is only checked
+when a batch is complete, since runs that die out finish first. It is undecided when neither bound is crossed after
+max_attempts runs.
+With the defaults and alpha = 0.005, a batch of 25 runs without survivals decides died, and one with 4 decides survived.
+'''
+class SequentialRound(Round):
+    def __init__(self, executor, rate, dimension, attempts, cancel, alpha):
+        super().__init__(executor, rate, dimension, attempts, cancel)
+        self.alpha = alpha
+        self.survivals = 0
+    def update(self):
+        self.survivals += sum(int(np.sum(result)) for result in self.collect())
+        if self.pending or self.survived is not None or self.undecided:
+            return
+        ratio = log_likelihood_ratio(self.survivals, self.runs)
+        if ratio >= math.log((1 - self.alpha) / self.alpha):
+            self.survived = True
+        elif ratio <= math.log(self.alpha / (1 - self.alpha)):
+            self.survived = False
+        elif self.runs >= max_attempts:
+            self.undecided = True
+        else:
+            self.pending = submit_runs(self.executor, self.rate, self.dimension, self.attempts, self.cancel, self.batches)
+            self.batches += 1
+
+'''
+Bisection object for the critical value in one dimension, which only submits work and never blocks, so that
+bisections for several dimensions can share one executor.
+Besides the midpoint, rounds for both candidate midpoints of the next step are run speculatively, since either may be
+needed next. Once a round is decided, or is no longer one of the wanted rates, its remaining runs are cancelled, which
+frees their workers for the rounds that are still needed.
+With sequential testing the critical value is the rate at which the probability to reach thres equals survival_level.
+The error probability 1 - confidence is split evenly over the midpoints, since the bounds of the sequential test
+already hold over all its looks. So with probability at least confidence no midpoint whose survival probability lies
+outside the indifference zone of log_likelihood_ratio is decided wrongly, and the final bracket is a confidence
+interval for the rates at which the survival probability crosses that zone. If a midpoint is undecided after
+max_attempts runs, it is too close to the critical value to resolve and the bisection stops early with the current
+bracket.
+'''
+class Bisection:
+    def __init__(self, executor, flags, dimension, low, high, attempts, epsilon, sequential=False):
+        self.executor = executor
+        self.flags = flags
+        self.dimension = dimension
+        self.low = low
+        self.high = high
+        self.attempts = attempts
+        self.epsilon = epsilon
+        self.sequential = sequential
+        midpoints = max(1, math.ceil(math.log2(max(high - low, epsilon) / epsilon)))
+        self.alpha = (1 - confidence) / midpoints
+        self.rounds = {}
+        self.runs = 0
+        self.stopped_early = False
+        self.schedule()
+    def __repr__(self):
+        return f"Bisection(dimension={self.dimension}, low={self.low}, high={self.high}, rounds={len(self.rounds)})"
+    @property
+    def done(self):
+        return self.stopped_early or self.high - self.low <= self.epsilon
+    def stop(self, rate):
+        round = self.rounds.pop(rate)
+        round.stop(self.flags)
+        self.runs += round.runs
+        return round
+    def schedule(self):
+        mid = (self.low + self.high) / 2
+        wanted = []
+        if not self.done:
+            wanted.append(mid)
+            if (self.high - self.low) / 2 > self.epsilon:
+                wanted += [(self.low + mid) / 2, (mid + self.high) / 2]
+        for rate in list(self.rounds):
+            if rate not in wanted:
+                self.stop(rate)
+        for rate in wanted:
+            if rate not in self.rounds:
+                cancel = self.flags.new()
+                if self.sequential:
+                    self.rounds[rate] = SequentialRound(self.executor, rate, self.dimension, self.attempts, cancel, self.alpha)
+                else:
+                    self.rounds[rate] = Round(self.executor, rate, self.dimension, self.attempts, cancel)
+    def pending(self):
+        return set().union(*(round.pending for round in self.rounds.values()))
+    '''
+    Processes the finished runs, and moves the bracket for as long as the current midpoint is decided.
+    Returns True if the bracket has changed.
+    '''
+    def update(self):
+        for round in self.rounds.values():
+            round.update()
+        changed = False
+        while not self.done:
+            mid = (self.low + self.high) / 2
+            if self.rounds[mid].survived is None and not self.rounds[mid].undecided:
+                break
+            current = self.stop(mid)
+            if current.undecided:
+                self.stopped_early = True
+                print(f"Dimension {self.dimension}: rate {mid:.6f} is undecided after {current.runs} runs, stopping early.")
+            elif current.survived:
+                self.high = mid
+            else:
+                self.low = mid
+            changed = True
+            self.schedule()
+            print(f"Dimension {self.dimension}: the critical value is likely between {self.low:.6f} and {self.high:.6f}.")
+        return changed
+
 '''' 
 low         :    The lower bound for the critical value
 high        :    The upper bound for the critical value 
 attempts    :    The number of attempts to run the contact process
 epsilon     :    The tolerance for the bisection method
 dimension   :    Dimension of the graph Z^d
+sequential  :    Whether to use sequential testing, see Bisection
 Given a lower and upper bound, estimate the critical value using bisection method.
+With the jit engine, and the batch engine which falls back to it for small rounds, the kernel is compiled once here
+first, so that the workers find it in the on-disk cache.
 Returns lower and upper estimate for the critical value
 '''
-def crit_value_bisection(low, high, attempts, epsilon, dimension):
-    with loky.get_reusable_executor(max_workers=14) as executor:
-        while high - low > epsilon:
-            found_true = False
-            tasks_completed = 0
-            mid = (low + high) / 2
-            futures = set()
-            for _ in range(attempts):
-                future = executor.submit(run_contact_process, mid, dimension)
-                futures.add(future)
-            for future in as_completed(futures): 
-                tasks_completed += 1
-                result = future.result()
-                if result:
-                    found_true = True
-                if found_true:
+def crit_value_bisection(low, high, attempts, epsilon, dimension, sequential=False):
+    if engine in ('jit', 'batch'):
+        run_contact_process_jit(0.0, dimension)
+    with CancelFlags() as flags, loky.get_reusable_executor(max_workers=workers) as executor:
+        bisection = Bisection(executor, flags, dimension, low, high, attempts, epsilon, sequential)
+        while not bisection.done:
+            wait(bisection.pending(), return_when=FIRST_COMPLETED)
+            bisection.update()
+        bisection.schedule()
+    if sequential:
+        print(f"{confidence:.0%} confidence interval for the critical value: [{bisection.low:.6f}, {bisection.high:.6f}], using {bisection.runs} runs.")
+    return bisection.high, bisection.low
+
+'''
+Sequential version of crit_value_bisection, where each midpoint is only sampled until the sequential test decides it.
+With the defaults and at most ten midpoints, rates whose survival probability lies well outside the indifference zone
+mostly cost a single batch of attempts runs, and only the midpoints close to the critical value get more.
+Returns lower and upper end of the confidence interval for the critical value
+'''
+def crit_value_sequential(low, high, attempts, epsilon, dimension):
+    return crit_value_bisection(low, high, attempts, epsilon, dimension, sequential=True)
+
+'''
+dimensions      :    The dimensions for which to determine the critical value
+attempts        :    The number of attempts to run the contact process
+epsilon         :    The tolerance for the bisection method
+results_path    :    The file in which the brackets are stored
+Runs the bisections for several dimensions at once on one executor, at most sweep_width at the same time.
+Whenever the bracket of a dimension changes, it is appended to the results file as a JSON line, with done set once
+the bisection of that dimension is finished. When the sweep is started again with the same results file, finished
+dimensions are skipped and unfinished ones resume from their last bracket. A malformed last line, left behind by a
+sweep that was killed while writing, is skipped and cut off the file.
+Returns a dictionary with the (low, high) bracket of every dimension
+'''
+def sweep(dimensions, attempts, epsilon, results_path):
+    brackets = {}
+    finished = set()
+    if os.path.exists(results_path):
+        with open(results_path, 'rb+') as results:
+            lines = results.readlines()
+            valid = 0
+            for number, line in enumerate(lines):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    if number < len(lines) - 1:
+                        raise
+                    results.truncate(valid)
                     break
-            if found_true:
-                high = mid
+                valid += len(line)
+                brackets[record['dimension']] = (record['low'], record['high'])
+                if record['done']:
+                    finished.add(record['dimension'])
             else:
-                low = mid
-            print(f"The critical value is likely between {low:.6f} and {high:.6f}.")
-    return high, low
+                if lines and not lines[-1].endswith(b'\n'):
+                    results.write(b'\n')
+    queue = [dimension for dimension in dimensions if dimension not in finished]
+    print(f"Root seed: {root_seed.entropy}")
+    if engine in ('jit', 'batch'):
+        run_contact_process_jit(0.0, 1)
+    active = []
+    with CancelFlags() as flags, loky.get_reusable_executor(max_workers=workers) as executor, \
+            open(results_path, 'a') as results:
+        while queue or active:
+            while queue and len(active) < sweep_width:
+                dimension = queue.pop(0)
+                low, high = brackets.get(dimension, (1/(2*dimension - 1), 2/(dimension)))
+                active.append(Bisection(executor, flags, dimension, low, high, attempts, epsilon, sequential))
+            wait(set().union(*(bisection.pending() for bisection in active)), return_when=FIRST_COMPLETED)
+            for bisection in list(active):
+                if bisection.update() or bisection.done:
+                    brackets[bisection.dimension] = (bisection.low, bisection.high)
+                    results.write(json.dumps({'dimension': bisection.dimension, 'low': bisection.low,
+                                              'high': bisection.high, 'done': bisection.done}) + '\n')
+                    results.flush()
+                if bisection.done:
+                    active.remove(bisection)
+                    print(f"The critical value in dimension {bisection.dimension} is likely between {bisection.low:.6f} and {bisection.high:.6f}.")
+    return brackets
 
 '''
 Determine the critical value in for various dimensions.
 '''
-for dimension in range(1, max_dimension + 1):
-    neighbour_offset = []
-    for i in range(dimension):
-        for offset in [1, -1]:
-            neighbour_offset.append([offset if j == i else 0 for j in range(dimension)])
-    rate_low = 1/(2*dimension - 1)
-    rate_high = 2/(dimension)
-    rate_high, rate_low = crit_value_bisection(rate_low, rate_high, attempts, 0.001, dimension)
-    print(f"The critical value in dimension {dimension} is likely between {rate_low:.6f} and {rate_high:.6f}.") 
\ No newline at end of file
+if __name__ == '__main__':
+    if harris:
+        print(f"Root seed: {root_seed.entropy}")
+        for dimension in range(1, max_dimension + 1):
+            rate_high, rate_low = crit_value_harris(1/(2*dimension - 1), 2/(dimension), harris_points, harris_replicas, dimension)
+            print(f"The critical value in dimension {dimension} is likely between {rate_low:.6f} and {rate_high:.6f}.")
+    else:
+        sweep(range(1, max_dimension + 1), attempts, epsilon, results_file)
@@ -0,0 +1,96 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import numpy as np
+from Contact_Process_Engine import contact_process_grid, EventGrid, CSRGraph, ActiveGraph
+'''
+Headless parameter sweeps of the contact process on a grid, for finite-size scaling studies. For every combination of
+rate, grid size and boundary condition we run a number of replicas from a fully infected grid over a process pool, and
+record the density of infected cells every dt ms until max_time or extinction. The summary of every combination holds
+the extinction probability before max_time, the mean and median survival time of the replicas that died out, and the
+mean density over time, and all summaries are written to a JSON file.
+
+Every replica gets its own seed spawned from the root seed, so a sweep is reproducible for a given root seed and does
+not depend on the number of workers.
+'''
+
+def run_replica(task):
+    '''
+    task    :   Tuple of (engine, rate, size, boundary, dt, max_time, seed) of a replica
+    Runs the contact process from a fully infected size x size grid until max_time or extinction.
+    Returns the extinction time, or None if the process survived, and the density after every dt ms.
+    '''
+    engine, rate, size, boundary, dt, max_time, seed = task
+    rng = np.random.default_rng(seed)
+    periodic = boundary == 'periodic'
+    grid = np.ones((size, size), dtype=bool)
+    events = EventGrid(grid, periodic, rng) if engine == 'events' else None
+    active = ActiveGraph(grid.ravel(), CSRGraph.grid(size, size, periodic), rng) if engine == 'active' else None
+    densities = []
+    for step in range(int(max_time / dt)):
+        if engine == 'events':
+            events.advance(dt, rate)
+            infected = len(events.infected)
+        elif engine == 'active':
+            active.advance(dt, rate)
+            infected = active.infected
+        else:
+            grid = contact_process_grid(grid, dt, rate, periodic, rng)
+            infected = np.count_nonzero(grid)
+        densities.append(infected / size**2)
+        if densities[-1] == 0:
+            return (events.time if engine == 'events' else (step + 1)*dt), densities
+    return None, densities
+
+def summarise(rate, size, boundary, results, steps):
+    '''
+    rate, size, boundary    :   The parameters of the replicas
+    results                 :   The extinction times and densities of all replicas
+    steps                   :   The number of density samples of a replica that survives until max_time
+    Returns the summary statistics of the replicas. Replicas that died out count with density 0 after extinction.
+    '''
+    times = [time for time, _ in results if time is not None]
+    densities = np.zeros((len(results), steps))
+    for i, (_, density) in enumerate(results):
+        densities[i, :len(density)] = density
+    return {'rate': rate, 'size': size, 'boundary': boundary, 'replicas': len(results),
+            'extinction_probability': len(times) / len(results),
+            'mean_survival_time': float(np.mean(times)) if times else None,
+            'median_survival_time': float(np.median(times)) if times else None,
+            'density': densities.mean(axis=0).tolist()}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sweep the contact process on a grid over rates, sizes and boundaries.")
+    parser.add_argument('--rates', nargs='+', type=float, default=[0.38, 0.41, 0.44])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[16, 32, 64])
+    parser.add_argument('--boundaries', nargs='+', default=['periodic'], choices=['open', 'periodic'])
+    parser.add_argument('--replicas', type=int, default=100)
+    parser.add_argument('--engine', default='events', choices=['events', 'grid', 'active'],
+                        help="the exact event driven EventGrid, the synchronous contact_process_grid, or its active set "
+                        "version ActiveGraph")
+    parser.add_argument('--dt', type=float, default=500, help="time in ms between two density samples")
+    parser.add_argument('--max-time', type=float, default=100000, help="time in ms after which a replica survives")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--seed', type=int, help="root seed, random if not given")
+    parser.add_argument('--output', default='sweep_results.json')
+    args = parser.parse_args()
+
+    root_seed = np.random.SeedSequence(args.seed)
+    print(f"Root seed {root_seed.entropy}")
+    combinations = list(itertools.product(args.rates, args.sizes, args.boundaries))
+    seeds = iter(root_seed.spawn(len(combinations) * args.replicas))
+    tasks = [(args.engine, rate, size, boundary, args.dt, args.max_time, next(seeds))
+             for rate, size, boundary in combinations for _ in range(args.replicas)]
+    steps = int(args.max_time / args.dt)
+    summaries = []
+    with multiprocessing.Pool(args.workers) as pool:
+        results = pool.map(run_replica, tasks, chunksize=max(1, len(tasks) // (4 * args.workers)))
+    for i, (rate, size, boundary) in enumerate(combinations):
+        summary = summarise(rate, size, boundary, results[i*args.replicas:(i + 1)*args.replicas], steps)
+        summaries.append(summary)
+        print(f"rate={rate} size={size} {boundary}: extinction probability {summary['extinction_probability']:.3f}, "
+              f"mean survival time {summary['mean_survival_time']}, final density {summary['density'][-1]:.3f}")
+    with open(args.output, 'w') as output:
+        json.dump({'seed': root_seed.entropy, 'engine': args.engine, 'dt': args.dt, 'max_time': args.max_time,
+                   'results': summaries}, output, indent=2)